@@ -0,0 +1,3 @@
+#!/bin/bash
+
+celery -A slack_integration_service worker -Q slack_events --concurrency=1 --loglevel=info
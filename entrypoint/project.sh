@@ -6,4 +6,5 @@ PORT=7777
 python manage.py makemigrations
 python manage.py migrate
 python manage.py loaddata dump.json
+python manage.py build_thread_ts_index
 python manage.py runserver "$HOST":"$PORT"
@@ -0,0 +1,223 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from slack_integration import caches, event_stream
+from slack_integration.tasks import deliver_callback
+
+from . import serializers
+from .permissions import IsDeveloper
+from .slack_rate_limiter import SlackRateLimited
+from .slack_web_client import AsyncCustomSlackWebClient
+
+
+class AsyncAPIView:
+    """
+    Base view for the async endpoints. Authenticates the request,
+    checks the permissions and validates the data the same way
+    DRF views do, but in a thread, so the event loop is not blocked.
+    """
+    permission_classes = ()
+    http_method_names = ('get', 'post', 'put', 'patch', 'delete')
+
+    @classmethod
+    def as_view(cls):
+        """
+        Returns the coroutine function view, Django runs it
+        in the event loop under ASGI.
+        """
+        async def view(request, *args, **kwargs):
+            self = cls()
+            method = request.method.lower()
+            if method not in cls.http_method_names or not hasattr(self,
+                                                                  method):
+                return HttpResponseNotAllowed(
+                    [name.upper() for name in cls.http_method_names
+                     if hasattr(self, name)])
+
+            return await getattr(self, method)(request, *args, **kwargs)
+
+        # The requests are authenticated by the tokens
+        view.csrf_exempt = True
+        return view
+
+    async def get_valid_data(self, request, serializer_class):
+        return await sync_to_async(self._get_valid_data)(request,
+                                                         serializer_class)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, SlackRateLimited):
+            exc = exceptions.Throttled(wait=exc.retry_after)
+
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {'detail': exc.detail}
+
+        response = JsonResponse(data, status=exc.status_code, safe=False)
+        if getattr(exc, 'wait', None):
+            response['Retry-After'] = str(int(exc.wait))
+
+        return response
+
+    def _get_valid_data(self, request, serializer_class):
+        drf_request = Request(
+            request,
+            parsers=[parser() for parser in
+                     api_settings.DEFAULT_PARSER_CLASSES],
+            authenticators=[authenticator() for authenticator in
+                            api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+
+        for permission in (permission_class() for permission_class in
+                           self.permission_classes):
+            if not permission.has_permission(drf_request, self):
+                if not drf_request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+
+        serializer = serializer_class(data=drf_request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return serializer.validated_data
+
+
+class AsyncCreateUpdateDestroySlackMessageView(AsyncAPIView):
+    """
+    Async variant of `CreateUpdateDestroySlackMessageView` for the ASGI
+    entry point. A worker is not blocked while waiting for Slack API,
+    so it can keep hundreds of the calls in flight.
+    """
+    permission_classes = (IsDeveloper,)
+
+    async def post(self, request):
+        try:
+            valid_data = await self.get_valid_data(
+                             request, serializers.PostMessageSerializer)
+
+            slack_web_client = AsyncCustomSlackWebClient(
+                                   valid_data['app_obj'],
+                                   valid_data['template_obj'])
+            slack_response = await slack_web_client.post_message(
+                                 valid_data['text'])
+        except (exceptions.APIException, SlackRateLimited) as exc:
+            return self.handle_exception(exc)
+
+        return JsonResponse(slack_response.data,
+                            status=slack_response.status_code)
+
+    async def put(self, request):
+        try:
+            valid_data = await self.get_valid_data(
+                             request, serializers.UpdateMessageSerializer)
+
+            slack_web_client = AsyncCustomSlackWebClient(
+                                   valid_data['app_obj'],
+                                   valid_data['template_obj'])
+            slack_response = await slack_web_client.update_message(
+                                 valid_data['text'],
+                                 valid_data['ts'])
+        except (exceptions.APIException, SlackRateLimited) as exc:
+            return self.handle_exception(exc)
+
+        return JsonResponse(slack_response.data,
+                            status=slack_response.status_code)
+
+    async def delete(self, request):
+        try:
+            valid_data = await self.get_valid_data(
+                             request, serializers.DeleteMessageSerializer)
+
+            slack_web_client = AsyncCustomSlackWebClient(
+                                   valid_data['app_obj'],
+                                   channel_id=valid_data['channel_id'])
+            slack_response = await slack_web_client.delete_message(
+                                 valid_data['ts'])
+        except (exceptions.APIException, SlackRateLimited) as exc:
+            return self.handle_exception(exc)
+
+        return JsonResponse(slack_response.data,
+                            status=slack_response.status_code)
+
+
+class AsyncInteractivityProcessingView(AsyncAPIView):
+    """
+    Async variant of `InteractivityProcessingView`. The cache lookup
+    and the enqueueing of the delivery are made in threads, so
+    the event loop keeps acknowledging other requests meanwhile.
+    """
+
+    async def post(self, request):
+        payload = request.POST['payload']
+        unpacked_interactivity_payload = json.loads(payload)
+        block_id = unpacked_interactivity_payload['actions'][0].get('block_id')
+
+        # if the block_id is not None, then there was an interaction
+        # with any button from the actions block
+        if block_id:
+            callback = await sync_to_async(
+                           caches.get_actions_block_subscription)(block_id)
+            if callback:
+                await sync_to_async(deliver_callback,
+                                    thread_sensitive=False)(
+                    callback['callback_url'], request.POST,
+                    callback['callback_max_batch_size'],
+                    callback['callback_max_linger_ms'])
+
+        return JsonResponse({})
+
+
+class AsyncSlackEventsView(AsyncAPIView):
+    """
+    Async variant of `SlackEventsView`.
+    """
+
+    async def post(self, request):
+        data = json.loads(request.body)
+
+        # Slack retries the events not acknowledged in time
+        event_id = data.get('event_id')
+        # The cache and the broker calls do not touch the database,
+        # so the events are not serialized in the thread of the ORM.
+        if event_id and not await sync_to_async(
+                caches.mark_event_received,
+                thread_sensitive=False)(event_id):
+            return JsonResponse(data)
+
+        try:
+            await self._handle_event(data)
+        except Exception:
+            # The event is not lost, Slack retries it
+            if event_id:
+                await sync_to_async(caches.unmark_event_received,
+                                    thread_sensitive=False)(event_id)
+            raise
+
+        return JsonResponse(data)
+
+    @staticmethod
+    async def _handle_event(data):
+        if settings.SLACK_EVENTS_INGESTION_MODE == 'stream':
+            await sync_to_async(event_stream.append_event,
+                                thread_sensitive=False)(data)
+            return
+
+        event = data.get('event', {})
+        thread_ts = event.get('thread_ts')
+
+        # if an event is a thread message, the thread_ts is not None.
+        if thread_ts:
+            thread_subscription = await sync_to_async(
+                                      caches.get_thread_subscription)(
+                                          event.get('channel'), thread_ts)
+            if thread_subscription:
+                await sync_to_async(deliver_callback,
+                                    thread_sensitive=False)(
+                    thread_subscription['callback_url'], data,
+                    thread_subscription['callback_max_batch_size'],
+                    thread_subscription['callback_max_linger_ms'])
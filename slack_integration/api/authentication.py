@@ -0,0 +1,28 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from slack_integration import caches
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication keeping the tokens with their users
+    in the cache for `AUTH_TOKEN_CACHE_TIMEOUT` seconds.
+    The cached token is dropped when it is deleted
+    or its user is changed (e.g. deactivated).
+    """
+
+    def authenticate_credentials(self, key):
+        token = caches.get_auth_token(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            caches.set_auth_token(token)
+        elif not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        # The group names are memoized on the user object
+        caches.get_user_group_names(token.user)
+
+        return token.user, token
@@ -1,5 +1,3 @@
-import json
-
 from django.db import transaction
 from django.forms.models import model_to_dict
 
@@ -7,7 +5,7 @@ from rest_framework import mixins
 from rest_framework.response import Response
 from rest_framework import status
 
-from django_celery_beat.models import PeriodicTask
+from slack_integration import schedules
 
 
 class RetrieveMixin:
@@ -53,10 +51,7 @@ class UpdateMixin(mixins.UpdateModelMixin):
     @transaction.atomic
     def perform_update(self, serializer):
         schedule = serializer.save()
-        periodic_task_obj = self._get_periodic_task_obj_if_exists(
-                                self.get_object())
-        periodic_task_obj.crontab = schedule
-        periodic_task_obj.save()
+        schedules.schedule_template(self.get_object(), schedule)
 
 
 class CreateMixin(mixins.CreateModelMixin):
@@ -76,15 +71,7 @@ class CreateMixin(mixins.CreateModelMixin):
     @transaction.atomic
     def perform_create(self, serializer):
         schedule = serializer.save()
-        app_id, template_id = self._get_periodic_task_name_data(
-                                  self.get_object()).values()
-        PeriodicTask.objects.create(
-            crontab=schedule,
-            name=f'app_id:{app_id}|template_id:{template_id}',
-            task='slack_integration.tasks.post_message',
-            kwargs=json.dumps({'app_id': app_id,
-                               'template_id': template_id})
-        )
+        schedules.schedule_template(self.get_object(), schedule)
 
 
 class DestroyMixin(mixins.DestroyModelMixin):
@@ -96,5 +83,8 @@ class DestroyMixin(mixins.DestroyModelMixin):
             error = {'crontab': 'crontab for this template does not exist'}
             return Response(error, status=status.HTTP_404_NOT_FOUND)
 
-        self.perform_destroy(periodic_task_obj)
+        self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def perform_destroy(self, instance):
+        schedules.unschedule_template(instance)
@@ -0,0 +1,11 @@
+class GetQuerysetListMixin:
+    """
+    The `queryset` is tuned to the detail serializer, the lighter
+    one for the `list` serializer is taken from `querysets_dict`.
+    """
+
+    def get_queryset(self):
+        if self.action == 'list':
+            return self.querysets_dict['list'].all()
+
+        return super().get_queryset()
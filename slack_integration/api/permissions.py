@@ -1,12 +1,14 @@
 from rest_framework.permissions import BasePermission
 
+from slack_integration import caches
+
 
 class IsAdmin(BasePermission):
     """
     Checks if a user is a member of the Admin group.
     """
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Admin').exists()
+        return 'Admin' in caches.get_user_group_names(request.user)
 
 
 class IsDeveloper(BasePermission):
@@ -14,4 +16,4 @@ class IsDeveloper(BasePermission):
     Checks if a user is a member of the Developer group.
     """
     def has_permission(self, request, view):
-        return request.user.groups.filter(name='Developer').exists()
+        return 'Developer' in caches.get_user_group_names(request.user)
@@ -40,7 +40,9 @@ class TemplateSerializer(ValidateSubsCallbackUrlMixin,
     class Meta(TemplateBaseSerializer.Meta):
         fields = (TemplateBaseSerializer.Meta.fields +
                   ('channel_id', 'message_text', 'fallback_text',
-                   'actions_block', 'thread_subscription', 'callback_url'))
+                   'actions_block', 'thread_subscription', 'callback_url',
+                   'callback_max_batch_size', 'callback_max_linger_ms',
+                   'message_timestamps_retention_days'))
         extra_kwargs = {
             'actions_block': {'read_only': True},
         }
@@ -64,6 +66,49 @@ class CrontabScheduleSerializer(serializers.ModelSerializer):
         return CrontabSchedule.objects.get_or_create(**validated_data)[0]
 
 
+class BulkTemplateCrontabSerializer(serializers.Serializer):
+    templates = fields.ListField(child=fields.IntegerField(),
+                                 allow_empty=False)
+    crontab = CrontabScheduleSerializer(required=False)
+
+    def validate_templates(self, template_ids):
+        if len(template_ids) > settings.SLACK_BULK_MAX_TEMPLATES:
+            raise serializers.ValidationError(
+                f'Ensure this field has no more than '
+                f'{settings.SLACK_BULK_MAX_TEMPLATES} elements.')
+
+        template_objs = Template.objects.in_bulk(template_ids)
+
+        errors = [{} if template_id in template_objs else
+                  'Template with this id does not exist.'
+                  for template_id in template_ids]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return [template_objs[template_id]
+                for template_id in dict.fromkeys(template_ids)]
+
+    def validate(self, attrs):
+        request_method = self.context['request'].method
+
+        if request_method in ('POST', 'PUT') and 'crontab' not in attrs:
+            raise serializers.ValidationError(
+                {'crontab': 'crontab fields are not specified'})
+
+        if request_method == 'POST':
+            errors = ['crontab for this template already exists'
+                      if template_obj.periodic_task_id else {}
+                      for template_obj in attrs['templates']]
+        else:
+            errors = [{} if template_obj.periodic_task_id else
+                      'crontab for this template does not exist'
+                      for template_obj in attrs['templates']]
+        if any(errors):
+            raise serializers.ValidationError({'templates': errors})
+
+        return attrs
+
+
 class ActionsBlockBaseSerializer(serializers.ModelSerializer):
     class Meta:
         model = ActionsBlock
@@ -76,7 +121,9 @@ class ActionsBlockSerializer(ValidateSubsCallbackUrlMixin,
 
     class Meta(ActionsBlockBaseSerializer.Meta):
         fields = (ActionsBlockBaseSerializer.Meta.fields +
-                  ('action_subscription', 'callback_url', 'buttons'))
+                  ('action_subscription', 'callback_url',
+                   'callback_max_batch_size', 'callback_max_linger_ms',
+                   'buttons'))
         extra_kwargs = {
             'buttons': {'read_only': True},
         }
@@ -85,7 +132,7 @@ class ActionsBlockSerializer(ValidateSubsCallbackUrlMixin,
 class ButtonSerializer(serializers.ModelSerializer):
     template = serializers.IntegerField(
         read_only=True,
-        source='actions_block.template.pk')
+        source='actions_block.template_id')
 
     class Meta:
         model = Button
@@ -98,21 +145,30 @@ class PostMessageSerializer(serializers.Serializer):
     text = fields.CharField()
 
     def validate(self, attrs):
+        """
+        Resolves the template together with its application
+        and actions block in a single query.
+        """
         errors = dict()
 
         try:
-            app = SlackApplication.objects.get(name=attrs['app_name'])
+            template_obj = Template.objects.select_related(
+                'application', 'actions_block').get(
+                    application__name=attrs['app_name'],
+                    name=attrs['template_name'])
         except ObjectDoesNotExist:
-            errors['app_name'] = 'Application with this name does not exist.'
+            # The second query is made only to report the proper error
+            if not SlackApplication.objects.filter(
+                    name=attrs['app_name']).exists():
+                errors['app_name'] = ('Application with this name '
+                                      'does not exist.')
+            else:
+                errors['template_name'] = ('Template with this name '
+                                           'does not exist.')
             raise serializers.ValidationError(errors)
 
-        # In case the application is found
-        try:
-            Template.objects.get(application=app,
-                                 name=attrs['template_name'])
-        except ObjectDoesNotExist:
-            errors['template_name'] = 'Template with this name does not exist.'
-            raise serializers.ValidationError(errors)
+        attrs['template_obj'] = template_obj
+        attrs['app_obj'] = template_obj.application
 
         return attrs
 
@@ -121,7 +177,72 @@ class UpdateMessageSerializer(PostMessageSerializer):
     ts = fields.CharField()
 
 
+class BulkPostMessageItemSerializer(serializers.Serializer):
+    app_name = fields.CharField()
+    template_name = fields.CharField()
+    text = fields.CharField()
+
+
+class BulkPostMessageSerializer(serializers.Serializer):
+    messages = BulkPostMessageItemSerializer(many=True, allow_empty=False)
+
+    def validate_messages(self, messages):
+        if len(messages) > settings.SLACK_BULK_MAX_MESSAGES:
+            raise serializers.ValidationError(
+                f'Ensure this field has no more than '
+                f'{settings.SLACK_BULK_MAX_MESSAGES} elements.')
+
+        app_names = {message['app_name'] for message in messages}
+        template_names = {message['template_name'] for message in messages}
+
+        template_objs = {
+            (template_obj.application.name, template_obj.name): template_obj
+            for template_obj in Template.objects.select_related(
+                'application').filter(application__name__in=app_names,
+                                      name__in=template_names)
+        }
+
+        errors = []
+        existing_app_names = None
+        for message in messages:
+            template_obj = template_objs.get((message['app_name'],
+                                              message['template_name']))
+            if template_obj:
+                message['template_obj'] = template_obj
+                errors.append({})
+                continue
+
+            # The second query is made only if something is not found
+            if existing_app_names is None:
+                existing_app_names = set(SlackApplication.objects.filter(
+                    name__in=app_names).values_list('name', flat=True))
+
+            if message['app_name'] not in existing_app_names:
+                errors.append({'app_name': 'Application with this name '
+                                           'does not exist.'})
+            else:
+                errors.append({'template_name': 'Template with this name '
+                                                'does not exist.'})
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return messages
+
+
 class DeleteMessageSerializer(serializers.Serializer):
     app_name = fields.CharField()
     channel_id = fields.CharField()
     ts = fields.CharField()
+
+    def validate(self, attrs):
+        errors = dict()
+
+        try:
+            attrs['app_obj'] = SlackApplication.objects.get(
+                                   name=attrs['app_name'])
+        except ObjectDoesNotExist:
+            errors['app_name'] = 'Application with this name does not exist.'
+            raise serializers.ValidationError(errors)
+
+        return attrs
@@ -1,5 +1,7 @@
 from django.core.exceptions import ObjectDoesNotExist
 
+from slack_integration import caches
+
 
 class PostSlackMessageConstructor:
     """Constructs the message for Slack API."""
@@ -9,16 +11,19 @@ class PostSlackMessageConstructor:
         self.message_text = message_text
 
     def get_message_payload(self):
+        skeleton = self._get_message_skeleton()
+
         message = {
-            'channel': self.template_obj.channel_id,
+            'channel': skeleton['channel'],
             # 'text' works as fallback
-            'text': self.template_obj.fallback_text,
+            'text': skeleton['fallback_text'],
             'blocks': [
                 {
                     'type': 'section',
                     'text': {
                         'type': 'mrkdwn',
-                        'text': self._get_concated_message()
+                        'text': self._get_concated_message(
+                                    skeleton['message_text'])
                     }
                 },
                 {
@@ -27,12 +32,30 @@ class PostSlackMessageConstructor:
             ]
         }
 
-        actions_block = self._get_actions_block()
-        if actions_block:
-            message['blocks'].append(actions_block)
+        if skeleton['actions_block']:
+            message['blocks'].append(skeleton['actions_block'])
 
         return message
 
+    def _get_message_skeleton(self):
+        """
+        Returns the part of the message that depends on the template
+        only. It is cached until the template, its actions block
+        or buttons are changed.
+        """
+        skeleton = caches.get_template_payload(self.template_obj.id)
+
+        if skeleton is None:
+            skeleton = {
+                'channel': self.template_obj.channel_id,
+                'fallback_text': self.template_obj.fallback_text,
+                'message_text': self.template_obj.message_text,
+                'actions_block': self._get_actions_block(),
+            }
+            caches.set_template_payload(self.template_obj.id, skeleton)
+
+        return skeleton
+
     def _get_actions_block(self):
         try:
             actions_block_obj = self.template_obj.actions_block
@@ -65,15 +88,15 @@ class PostSlackMessageConstructor:
 
         return buttons
 
-    def _get_concated_message(self):
+    def _get_concated_message(self, template_message_text):
         """
         Concatenates the sent message with the template message.
         """
         if self.message_text:
-            return (f"{self.template_obj.message_text}\n\n"
+            return (f"{template_message_text}\n\n"
                     f"{self.message_text}")
 
-        return self.template_obj.message_text
+        return template_message_text
 
 
 class UpdateSlackMessageConstructor(PostSlackMessageConstructor):
@@ -0,0 +1,112 @@
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+
+# Token bucket: refills `rate` tokens per second up to `burst` tokens.
+# Returns 0 if a token is taken, otherwise the number of seconds
+# to wait for the next token.
+TOKEN_BUCKET_SCRIPT = """
+redis.replicate_commands()
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens),
+           'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+BUCKET_KEY = 'slack_rate_limit:{app_id}:{channel_id}:{method}'
+DEFERRED_KEY = 'slack_deferred:{app_id}:{channel_id}'
+
+
+class SlackRateLimited(Exception):
+    """
+    The call to Slack API has to be postponed
+    for `retry_after` seconds.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f'Retry after {retry_after} seconds.')
+        self.retry_after = retry_after
+
+
+class SlackRateLimiter:
+    """
+    Paces the calls to Slack API per application and channel
+    according to `SLACK_RATE_LIMITS` setting. The state is kept
+    in Redis, so the limits are shared by all the workers.
+    """
+
+    def acquire(self, app_id, channel_id, method):
+        """
+        Raises `SlackRateLimited` if the call has to be postponed.
+        """
+        rate, burst = settings.SLACK_RATE_LIMITS[method]
+        key = BUCKET_KEY.format(app_id=app_id,
+                                channel_id=channel_id,
+                                method=method)
+
+        wait = float(self._get_token_bucket_script()(keys=[key],
+                                                     args=[rate, burst]))
+        if wait > 0:
+            raise SlackRateLimited(wait)
+
+    def defer(self, app_id, channel_id, job_id, retry_after):
+        """
+        Registers the job postponed for `retry_after` seconds
+        in the queue of the channel.
+        """
+        key = DEFERRED_KEY.format(app_id=app_id, channel_id=channel_id)
+        get_redis_connection().zadd(key, {job_id: time.time() + retry_after})
+
+    def resume(self, app_id, channel_id, job_id):
+        key = DEFERRED_KEY.format(app_id=app_id, channel_id=channel_id)
+        get_redis_connection().zrem(key, job_id)
+
+    def get_queue_depths(self):
+        """
+        Returns the number of postponed jobs per application and channel.
+        Jobs that have not resumed for `SLACK_DEFERRED_JOBS_STALE_AFTER`
+        seconds (e.g. revoked ones) are not counted.
+        """
+        redis_connection = get_redis_connection()
+        stale_before = time.time() - settings.SLACK_DEFERRED_JOBS_STALE_AFTER
+
+        queue_depths = []
+        for key in redis_connection.scan_iter(
+                match=DEFERRED_KEY.format(app_id='*', channel_id='*')):
+            redis_connection.zremrangebyscore(key, '-inf', stale_before)
+            depth = redis_connection.zcard(key)
+            if not depth:
+                continue
+
+            app_id, channel_id = key.decode().split(':', 2)[1:]
+            queue_depths.append({'app_id': int(app_id),
+                                 'channel_id': channel_id,
+                                 'depth': depth})
+
+        return queue_depths
+
+    @staticmethod
+    def _get_token_bucket_script():
+        return get_redis_connection().register_script(TOKEN_BUCKET_SCRIPT)
+
+
+slack_rate_limiter = SlackRateLimiter()
@@ -1,25 +1,43 @@
-from slack import WebClient as SlackWebClient
+import asyncio
+import time
+
+import aiohttp
+from asgiref.sync import sync_to_async
 from slack.errors import SlackApiError
 
-from slack_integration import models
+from slack_integration import metrics, models
 
 from .slack_message_constructors import (PostSlackMessageConstructor,
                                          UpdateSlackMessageConstructor,)
+from .slack_rate_limiter import SlackRateLimited, slack_rate_limiter
+from .slack_web_client_registry import slack_web_client_registry
 
 
 class CustomSlackWebClient:
+    """
+    Calls Slack API on behalf of the application.
+    Raises `SlackRateLimited` if a call has to be postponed
+    either by the `rate_limiter` or by Slack itself.
+    """
+
     def __init__(self, app_obj, template_obj=None, channel_id=None,
                  post_message_constr_class=PostSlackMessageConstructor,
-                 update_message_constr_class=UpdateSlackMessageConstructor,):
+                 update_message_constr_class=UpdateSlackMessageConstructor,
+                 rate_limiter=slack_rate_limiter,
+                 connection=None):
 
         self.post_message_constr_class = post_message_constr_class
         self.update_message_constr_class = update_message_constr_class
+        self.rate_limiter = rate_limiter
 
         self.app_obj = app_obj
         self.template_obj = template_obj
         self.channel_id = channel_id
 
-        self._make_connection()
+        if connection is None:
+            self._make_connection()
+        else:
+            self.connection = connection
 
     def post_message(self, message_text=None):
         post_message_constructor = self.post_message_constr_class(
@@ -27,11 +45,12 @@ class CustomSlackWebClient:
                                        message_text)
         message = post_message_constructor.get_message_payload()
 
-        try:
-            slack_response = self.connection.chat_postMessage(**message)
+        return self.post_prebuilt_message(message)
+
+    def post_prebuilt_message(self, message):
+        slack_response = self._call('chat_postMessage', **message)
+        if slack_response.data.get('ok'):
             self._create_message_timestamp_if_subs(slack_response)
-        except SlackApiError as e:
-            slack_response = e.response
 
         return slack_response
 
@@ -42,20 +61,57 @@ class CustomSlackWebClient:
                                          ts)
         message = update_message_constructor.get_message_payload()
 
+        return self._call('chat_update', **message)
+
+    def delete_message(self, ts):
+        return self._call('chat_delete', channel=self.channel_id, ts=ts)
+
+    def _call(self, method, **kwargs):
+        """
+        Calls the Slack API method, errors of Slack API
+        are returned as the response.
+        """
+        if self.rate_limiter:
+            self.rate_limiter.acquire(self.app_obj.id, kwargs['channel'],
+                                      method)
+
+        started_at = time.perf_counter()
         try:
-            slack_response = self.connection.chat_update(**message)
+            slack_response = getattr(self.connection, method)(**kwargs)
         except SlackApiError as e:
-            slack_response = e.response
+            self._observe_call(method, started_at, e.response)
+            return self._get_error_response(e)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._observe_call(method, started_at)
+            raise
 
+        self._observe_call(method, started_at, slack_response)
         return slack_response
 
-    def delete_message(self, ts):
-        try:
-            slack_response = self.connection.chat_delete(
-                                 channel=self.channel_id,
-                                 ts=ts)
-        except SlackApiError as e:
-            slack_response = e.response
+    def _observe_call(self, method, started_at, slack_response=None):
+        """
+        Records the duration of the call and the Slack error code
+        if it has failed.
+        """
+        labels = {'app_id': self.app_obj.id, 'method': method}
+
+        if slack_response is None:
+            status, error = 'error', 'connection_error'
+        else:
+            status = slack_response.status_code
+            error = (None if slack_response.data.get('ok') else
+                     slack_response.data.get('error', 'unknown_error'))
+
+        metrics.slack_api_request_duration.observe(
+            time.perf_counter() - started_at, status=status, **labels)
+        if error:
+            metrics.slack_api_errors.inc(error=error, **labels)
+
+    def _get_error_response(self, slack_api_error):
+        slack_response = slack_api_error.response
+        if slack_response.status_code == 429:
+            raise SlackRateLimited(
+                int(slack_response.headers.get('Retry-After', 1)))
 
         return slack_response
 
@@ -70,8 +126,72 @@ class CustomSlackWebClient:
             message_ts = slack_response.data['ts']
             models.MessageTimeStamp.objects.create(
                 template=self.template_obj,
+                channel_id=self.template_obj.channel_id,
                 ts=message_ts)
 
     def _make_connection(self):
-        token = self.app_obj.bot_user_oauth_access_token
-        self.connection = SlackWebClient(token=token)
+        self.connection = slack_web_client_registry.get_client(
+                              self.app_obj.id,
+                              self.app_obj.bot_user_oauth_access_token)
+
+
+class AsyncCustomSlackWebClient(CustomSlackWebClient):
+    """
+    Variant of `CustomSlackWebClient` for the event loop.
+    Slack API calls are awaited, so one worker can keep many of them
+    in flight. The database and cache calls are made in threads.
+    """
+
+    async def post_message(self, message_text=None):
+        post_message_constructor = self.post_message_constr_class(
+                                       self.template_obj,
+                                       message_text)
+        message = await sync_to_async(
+                      post_message_constructor.get_message_payload)()
+
+        slack_response = await self._call('chat_postMessage', **message)
+        if slack_response.data.get('ok'):
+            await sync_to_async(self._create_message_timestamp_if_subs)(
+                slack_response)
+
+        return slack_response
+
+    async def update_message(self, message_text, ts):
+        update_message_constructor = self.update_message_constr_class(
+                                         self.template_obj,
+                                         message_text,
+                                         ts)
+        message = await sync_to_async(
+                      update_message_constructor.get_message_payload)()
+
+        return await self._call('chat_update', **message)
+
+    async def delete_message(self, ts):
+        return await self._call('chat_delete', channel=self.channel_id, ts=ts)
+
+    async def _call(self, method, **kwargs):
+        # Redis calls only, they are not serialized with the ORM ones
+        observe_call = sync_to_async(self._observe_call,
+                                     thread_sensitive=False)
+        if self.rate_limiter:
+            await sync_to_async(self.rate_limiter.acquire,
+                                thread_sensitive=False)(
+                self.app_obj.id, kwargs['channel'], method)
+
+        started_at = time.perf_counter()
+        try:
+            slack_response = await getattr(self.connection, method)(**kwargs)
+        except SlackApiError as e:
+            await observe_call(method, started_at, e.response)
+            return self._get_error_response(e)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            await observe_call(method, started_at)
+            raise
+
+        await observe_call(method, started_at, slack_response)
+        return slack_response
+
+    def _make_connection(self):
+        self.connection = slack_web_client_registry.get_async_client(
+                              self.app_obj.id,
+                              self.app_obj.bot_user_oauth_access_token)
@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import threading
+import weakref
+
+import aiohttp
+from django.conf import settings
+from slack import WebClient as SlackWebClient
+
+
+class SlackWebClientRegistry:
+    """
+    Process-wide registry of long-lived Slack web clients.
+
+    Clients are keyed by the application id and its token, and each
+    one keeps a pooled aiohttp session, so consecutive calls reuse
+    the HTTP connections (and TLS sessions) to Slack API.
+    The aiohttp session is bound to an event loop, that is why
+    a client is created for every thread using the registry
+    and an async client - for every running event loop.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        # The loops of the clients of the threads, so the clients
+        # can be closed from any thread when they are dropped
+        self._client_loops = {}
+        self._async_clients = {}
+        self._closing_tasks = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_client(self, app_id, token):
+        thread_clients = self._get_thread_clients(app_id, token)
+
+        client = getattr(thread_clients, 'client', None)
+        if client is None:
+            loop = asyncio.new_event_loop()
+            client = thread_clients.client = self._make_client(token,
+                                                               loop=loop)
+            with self._lock:
+                client_loops = self._client_loops.get((app_id, token))
+                if client_loops is not None:
+                    client_loops[client] = loop
+                self.misses += 1
+        else:
+            self._increment('hits')
+
+        return client
+
+    def get_async_client(self, app_id, token):
+        """
+        Returns the client bound to the running event loop,
+        its API methods return coroutines. The clients of the closed
+        loops (e.g. `async_to_sync` runs a loop per call) are closed.
+        """
+        key = (app_id, token)
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            loop_clients = self._async_clients.get(key)
+            if loop_clients is None:
+                closed_clients = self._drop_clients(app_id, token)
+                loop_clients = self._async_clients[key] = {}
+            else:
+                closed_clients = []
+
+            closed_clients.extend(
+                (client_loop, loop_clients.pop(client_loop))
+                for client_loop in list(loop_clients)
+                if client_loop.is_closed())
+
+            client = loop_clients.get(loop)
+            if client is None:
+                client = loop_clients[loop] = self._make_client(
+                                                  token, loop=loop,
+                                                  run_async=True)
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        for client_loop, closed_client in closed_clients:
+            self._close_client(client_loop, closed_client)
+
+        return client
+
+    def find_client(self, app_id, token_fingerprint):
+        """
+        Returns the client of the thread for the application token
+        with the fingerprint or None if it is not created yet.
+        The callers can keep just the fingerprints of the tokens.
+        """
+        with self._lock:
+            thread_clients = next(
+                (thread_clients for (client_app_id, token), thread_clients
+                 in self._clients.items()
+                 if (client_app_id == app_id and
+                     get_token_fingerprint(token) == token_fingerprint)),
+                None)
+
+        client = getattr(thread_clients, 'client', None)
+        if client is not None:
+            self._increment('hits')
+
+        return client
+
+    def invalidate(self, app_id):
+        """
+        Drops all the clients of the application, for example,
+        when its `bot_user_oauth_access_token` is changed.
+        """
+        with self._lock:
+            dropped_clients = self._drop_clients(app_id)
+
+        for client_loop, client in dropped_clients:
+            self._close_client(client_loop, client)
+
+    def clear(self):
+        with self._lock:
+            app_ids = {app_id for app_id, _ in self._clients.keys() |
+                       self._async_clients.keys()}
+            dropped_clients = []
+            for app_id in app_ids:
+                dropped_clients.extend(self._drop_clients(app_id))
+            self.hits = 0
+            self.misses = 0
+
+        for client_loop, client in dropped_clients:
+            self._close_client(client_loop, client)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'applications': len(self._clients.keys() |
+                                    self._async_clients.keys())}
+
+    def _get_thread_clients(self, app_id, token):
+        key = (app_id, token)
+
+        with self._lock:
+            thread_clients = self._clients.get(key)
+            if thread_clients is None:
+                # The token of the application has changed
+                # or the application has never been used.
+                dropped_clients = self._drop_clients(app_id, token)
+                thread_clients = self._clients[key] = threading.local()
+                self._client_loops[key] = weakref.WeakKeyDictionary()
+            else:
+                dropped_clients = []
+
+        for client_loop, client in dropped_clients:
+            self._close_client(client_loop, client)
+
+        return thread_clients
+
+    def _drop_clients(self, app_id, token=None):
+        """
+        Drops the clients of the application except the ones
+        of the token. Returns the `(loop, client)` pairs
+        of the dropped clients, the caller closes them.
+        """
+        dropped_clients = []
+        for key in [key for key in self._clients.keys() |
+                    self._async_clients.keys()
+                    if key[0] == app_id and key[1] != token]:
+            self._clients.pop(key, None)
+            # The clients of the dead threads are already collected
+            client_loops = self._client_loops.pop(key, {})
+            dropped_clients.extend(
+                (client_loop, client)
+                for client, client_loop in client_loops.items())
+            loop_clients = self._async_clients.pop(key, {})
+            dropped_clients.extend(loop_clients.items())
+
+        return dropped_clients
+
+    def _increment(self, counter_name):
+        with self._lock:
+            setattr(self, counter_name, getattr(self, counter_name) + 1)
+
+    def _close_client(self, client_loop, client):
+        """
+        Closes the aiohttp session of the client bound to the loop,
+        which may be closed already or run by another thread.
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if client_loop.is_running() and client_loop is not running_loop:
+            # The loop is run by another thread right now
+            asyncio.run_coroutine_threadsafe(client.session.close(),
+                                             client_loop)
+        elif running_loop is not None:
+            # The loops can not be nested
+            task = running_loop.create_task(client.session.close())
+            # The loop keeps weak references to the tasks only
+            self._closing_tasks.add(task)
+            task.add_done_callback(self._closing_tasks.discard)
+        elif not client_loop.is_closed():
+            client_loop.run_until_complete(client.session.close())
+        else:
+            # The connections of a closed loop are released by aiohttp
+            # without the loop, it is just needed to run the coroutine.
+            closing_loop = asyncio.new_event_loop()
+            try:
+                closing_loop.run_until_complete(client.session.close())
+            finally:
+                closing_loop.close()
+
+    @staticmethod
+    def _make_client(token, loop, run_async=False):
+        connector = aiohttp.TCPConnector(
+            loop=loop,
+            limit=settings.SLACK_CLIENT_POOL_SIZE,
+            keepalive_timeout=settings.SLACK_CLIENT_KEEPALIVE_TIMEOUT)
+        session = aiohttp.ClientSession(
+            loop=loop,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=settings.SLACK_CLIENT_TIMEOUT))
+
+        return SlackWebClient(token=token,
+                              timeout=settings.SLACK_CLIENT_TIMEOUT,
+                              loop=loop,
+                              run_async=run_async,
+                              use_sync_aiohttp=not run_async,
+                              session=session)
+
+
+def get_token_fingerprint(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+slack_web_client_registry = SlackWebClientRegistry()
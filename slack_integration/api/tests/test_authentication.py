@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+
+from ..authentication import CachedTokenAuthentication
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='dev')
+        self.token = Token.objects.get_or_create(user=self.user)[0]
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_token_is_queried_once(self):
+        CachedTokenAuthentication().authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, _ = CachedTokenAuthentication().authenticate_credentials(
+                          self.token.key)
+
+        self.assertEqual(user, self.user)
+
+    def test_deleted_token_is_rejected(self):
+        key = self.token.key
+        CachedTokenAuthentication().authenticate_credentials(key)
+        # The primary key (the token key) is reset by the deletion
+        self.token.delete()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            CachedTokenAuthentication().authenticate_credentials(key)
+
+    def test_deactivated_user_is_rejected(self):
+        CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            CachedTokenAuthentication().authenticate_credentials(
+                self.token.key)
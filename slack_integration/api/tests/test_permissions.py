@@ -0,0 +1,44 @@
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from ..permissions import IsAdmin, IsDeveloper
+
+
+class GroupPermissionsTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        # The membership changes are rolled back without signals
+        cache.clear()
+
+    def _get_request(self, username):
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(username=username)
+        return request
+
+    def test_group_names_are_queried_once(self):
+        IsDeveloper().has_permission(self._get_request('dev'), None)
+        request = self._get_request('dev')
+
+        with self.assertNumQueries(0):
+            self.assertTrue(IsDeveloper().has_permission(request, None))
+            self.assertFalse(IsAdmin().has_permission(request, None))
+
+    def test_added_group_is_permitted(self):
+        IsAdmin().has_permission(self._get_request('dev'), None)
+        User.objects.get(username='dev').groups.add(
+            Group.objects.get(name='Admin'))
+
+        self.assertTrue(IsAdmin().has_permission(self._get_request('dev'),
+                                                 None))
+
+    def test_removed_member_is_not_permitted(self):
+        IsDeveloper().has_permission(self._get_request('dev'), None)
+        Group.objects.get(name='Developer').user_set.clear()
+
+        self.assertFalse(
+            IsDeveloper().has_permission(self._get_request('dev'), None))
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..serializers import PostMessageSerializer
+from ..slack_message_constructors import PostSlackMessageConstructor
+
+
+class PostMessageSerializerTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    data = {
+        'app_name': 'my_app',
+        'template_name': 'my_template',
+        'text': 'some text'
+    }
+
+    def test_message_is_resolved_with_one_query(self):
+        cache.clear()
+        serializer = PostMessageSerializer(data=self.data)
+        serializer.is_valid(raise_exception=True)
+        PostSlackMessageConstructor(
+            serializer.validated_data['template_obj']).get_message_payload()
+
+        serializer = PostMessageSerializer(data=self.data)
+        with self.assertNumQueries(1):
+            serializer.is_valid(raise_exception=True)
+            PostSlackMessageConstructor(
+                serializer.validated_data['template_obj'],
+                serializer.validated_data['text']).get_message_payload()
+
+        self.assertEqual(serializer.validated_data['app_obj'].name, 'my_app')
+
+    def test_message_is_built_with_two_queries_on_cold_cache(self):
+        cache.clear()
+        serializer = PostMessageSerializer(data=self.data)
+
+        # The template with its application and actions block, the buttons
+        with self.assertNumQueries(2):
+            serializer.is_valid(raise_exception=True)
+            PostSlackMessageConstructor(
+                serializer.validated_data['template_obj'],
+                serializer.validated_data['text']).get_message_payload()
+
+    def test_unknown_application(self):
+        serializer = PostMessageSerializer(data=dict(self.data,
+                                                     app_name='unknown'))
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('app_name', serializer.errors)
+
+    def test_unknown_template(self):
+        serializer = PostMessageSerializer(data=dict(self.data,
+                                                     template_name='unknown'))
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('template_name', serializer.errors)
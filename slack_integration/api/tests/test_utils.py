@@ -1,8 +1,17 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from slack.errors import SlackApiError
 
-from slack_integration.models import Template
+from slack_integration.models import Template, Button
 
 from ..slack_message_constructors import PostSlackMessageConstructor
+from ..slack_rate_limiter import SlackRateLimited
+from ..slack_web_client import CustomSlackWebClient
+from ..slack_web_client_registry import SlackWebClientRegistry
 
 
 class PostSlackMessageConstructorTest(TestCase):
@@ -20,3 +29,128 @@ class PostSlackMessageConstructorTest(TestCase):
         message_payload = constructor.get_message_payload()
 
         self.assertIsInstance(message_payload, dict)
+
+    def test_template_payload_is_cached(self):
+        cache.clear()
+        template_obj = Template.objects.get(pk=1)
+        PostSlackMessageConstructor(template_obj).get_message_payload()
+
+        template_obj = Template.objects.get(pk=1)
+        with self.assertNumQueries(0):
+            message_payload = PostSlackMessageConstructor(
+                template_obj, 'some text').get_message_payload()
+
+        self.assertEqual(message_payload['blocks'][0]['text']['text'],
+                         f'{template_obj.message_text}\n\nsome text')
+
+    def test_template_payload_is_invalidated_on_button_change(self):
+        cache.clear()
+        template_obj = Template.objects.get(pk=1)
+        PostSlackMessageConstructor(template_obj).get_message_payload()
+
+        button = Button.objects.get(pk=35)
+        button.text = 'new text'
+        button.save()
+
+        message_payload = PostSlackMessageConstructor(
+            template_obj).get_message_payload()
+        self.assertEqual(
+            message_payload['blocks'][2]['elements'][0]['text']['text'],
+            'new text')
+
+
+class SlackWebClientRegistryTest(TestCase):
+    def setUp(self):
+        self.registry = SlackWebClientRegistry()
+
+    def test_client_is_reused(self):
+        client = self.registry.get_client(1, 'token')
+
+        self.assertIs(self.registry.get_client(1, 'token'), client)
+        self.assertEqual(self.registry.stats()['hits'], 1)
+        self.assertEqual(self.registry.stats()['misses'], 1)
+
+    def test_token_change_replaces_client(self):
+        client = self.registry.get_client(1, 'token')
+
+        self.assertIsNot(self.registry.get_client(1, 'new token'), client)
+        self.assertEqual(self.registry.stats()['applications'], 1)
+        self.assertTrue(client.session.closed)
+
+    def test_invalidate(self):
+        client = self.registry.get_client(1, 'token')
+        self.registry.invalidate(1)
+
+        self.assertIsNot(self.registry.get_client(1, 'token'), client)
+        self.assertEqual(self.registry.stats()['misses'], 2)
+        self.assertTrue(client.session.closed)
+
+    def test_invalidate_closes_clients_of_other_threads(self):
+        clients = []
+        thread = threading.Thread(
+                     target=lambda: clients.append(
+                         self.registry.get_client(1, 'token')))
+        thread.start()
+        thread.join()
+
+        self.registry.invalidate(1)
+
+        self.assertTrue(clients[0].session.closed)
+
+    def test_async_client_of_closed_loop_is_closed(self):
+        async def get_async_client():
+            client = self.registry.get_async_client(1, 'token')
+            await asyncio.sleep(0)
+            return client
+
+        client = asyncio.run(get_async_client())
+        new_client = asyncio.run(get_async_client())
+
+        self.assertIsNot(new_client, client)
+        self.assertTrue(client.session.closed)
+        self.assertEqual(self.registry.stats()['misses'], 2)
+
+
+class CustomSlackWebClientTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    def setUp(self):
+        self.template_obj = Template.objects.select_related(
+                                'application').get(pk=1)
+        self.rate_limiter = mock.Mock()
+        self.slack_web_client = CustomSlackWebClient(
+                                    self.template_obj.application,
+                                    self.template_obj,
+                                    rate_limiter=self.rate_limiter)
+        self.slack_web_client.connection = mock.Mock()
+
+    def test_rate_limiter_is_asked_before_call(self):
+        self.rate_limiter.acquire.side_effect = SlackRateLimited(2)
+
+        with self.assertRaises(SlackRateLimited):
+            self.slack_web_client.post_message('text')
+
+        self.rate_limiter.acquire.assert_called_once_with(
+            self.template_obj.application.id,
+            self.template_obj.channel_id,
+            'chat_postMessage')
+        self.slack_web_client.connection.chat_postMessage.assert_not_called()
+
+    def test_slack_rate_limit_is_raised_with_retry_after(self):
+        slack_response = mock.Mock(status_code=429,
+                                   headers={'Retry-After': '30'})
+        self.slack_web_client.connection.chat_update.side_effect = (
+            SlackApiError('ratelimited', slack_response))
+
+        with self.assertRaises(SlackRateLimited) as cm:
+            self.slack_web_client.update_message('text', '1.0')
+
+        self.assertEqual(cm.exception.retry_after, 30)
+
+    def test_slack_error_is_returned(self):
+        slack_response = mock.Mock(status_code=404, headers={})
+        self.slack_web_client.connection.chat_update.side_effect = (
+            SlackApiError('message_not_found', slack_response))
+
+        self.assertIs(self.slack_web_client.update_message('text', '1.0'),
+                      slack_response)
@@ -1,3 +1,12 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 
@@ -5,9 +14,13 @@ from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
 from rest_framework import status
 
+from django_celery_beat.models import PeriodicTask
+
+from slack_integration import caches
 from slack_integration.models import (SlackApplication, Template,
-                                      ActionsBlock, Button)
+                                      ActionsBlock, Button, MessageTimeStamp)
 
+from ..async_views import AsyncSlackEventsView
 from .mixins import ViewSetActionsMixin
 
 
@@ -128,6 +141,58 @@ class ButtonViewSetTest(ViewSetActionsMixin, APITestCase):
     }
 
 
+class ViewSetQueryCountTest(APITestCase):
+    """
+    The number of queries of the viewsets does not depend
+    on the number of the related objects.
+    """
+    fixtures = ('test_dump.json',)
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(20):
+            template_obj = Template.objects.create(
+                               application_id=1, name=f'template {i}',
+                               channel_id='channel', message_text='text',
+                               fallback_text='text')
+            actions_block_obj = ActionsBlock.objects.create(
+                                    template=template_obj,
+                                    block_id=f'block {i}')
+            Button.objects.bulk_create(
+                Button(actions_block=actions_block_obj,
+                       action_id=f'action {j}', text=f'button {j}')
+                for j in range(2))
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.get(username='admin')
+        token = Token.objects.get_or_create(user=user)[0]
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_query_count(self):
+        expected_queries = (
+            (reverse('slackapplication-list'), 2),
+            (reverse('slackapplication-detail', args=(1,)), 2),
+            (reverse('template-list'), 2),
+            (reverse('template-detail', args=(1,)), 1),
+            (reverse('actionsblock-list'), 2),
+            (reverse('actionsblock-detail', args=(22,)), 2),
+            (reverse('button-list'), 2),
+            (reverse('button-detail', args=(35,)), 1),
+        )
+        # The token and the groups of the user are cached
+        self.client.get(reverse('template-list'))
+
+        for url, num_queries in expected_queries:
+            with self.subTest(url=url), self.assertNumQueries(num_queries):
+                response = self.client.get(url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
 class CreateUpdateDestroySlackMessageViewTest(APITestCase):
     fixtures = ('test_dump.json',)
     tested_url = reverse('slack-message')
@@ -148,3 +213,423 @@ class CreateUpdateDestroySlackMessageViewTest(APITestCase):
         delete_response = self.client.delete(self.tested_url)
         self.assertEqual(delete_response.status_code,
                          status.HTTP_403_FORBIDDEN)
+
+    @mock.patch('slack_integration.tasks.post_message.delay')
+    def test_async_mode_returns_job_id(self, delay_mock):
+        delay_mock.return_value.id = 'job'
+        user = User.objects.get(username='dev')
+        token = Token.objects.get_or_create(user=user)[0]
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+        response = self.client.post(self.tested_url + '?async=true',
+                                    {'app_name': 'my_app',
+                                     'template_name': 'my_template',
+                                     'text': 'text'})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data, {'job_id': 'job'})
+        self.assertEqual(response['Location'],
+                         reverse('slack-message-job', args=('job',)))
+        delay_mock.assert_called_once_with(1, 1, 'text')
+
+
+@mock.patch('slack_integration.api.views.AsyncResult')
+class SlackMessageJobViewTest(APITestCase):
+    fixtures = ('test_dump.json',)
+    tested_url = reverse('slack-message-job', args=('job',))
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.get(username='dev')
+        token = Token.objects.get_or_create(user=user)[0]
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def test_slack_answer_is_relayed(self, async_result_mock):
+        caches.add_slack_message_job('job')
+        async_result_mock.return_value.successful.return_value = True
+        async_result_mock.return_value.result = {'status_code': 200,
+                                                 'data': {'ok': True}}
+
+        response = self.client.get(self.tested_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'ok': True})
+
+    def test_unfinished_job_is_accepted(self, async_result_mock):
+        caches.add_slack_message_job('job')
+        async_result_mock.return_value.successful.return_value = False
+        async_result_mock.return_value.failed.return_value = False
+        async_result_mock.return_value.state = 'PENDING'
+
+        response = self.client.get(self.tested_url)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_unknown_job_is_not_found(self, async_result_mock):
+        response = self.client.get(self.tested_url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        async_result_mock.assert_not_called()
+
+    def test_not_message_job_result_is_not_found(self, async_result_mock):
+        caches.add_slack_message_job('job')
+        async_result_mock.return_value.successful.return_value = True
+        async_result_mock.return_value.result = 3
+
+        response = self.client.get(self.tested_url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AsyncCreateUpdateDestroySlackMessageViewTest(APITestCase):
+    fixtures = ('test_dump.json',)
+    tested_url = reverse('slack-message-async')
+
+    def _authenticate(self, username):
+        user = User.objects.get(username=username)
+        token = Token.objects.get_or_create(user=user)[0]
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def test_not_developer_does_not_have_access(self):
+        self._authenticate('admin')
+
+        response = self.client.post(self.tested_url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_data(self):
+        self._authenticate('dev')
+
+        response = self.client.post(self.tested_url,
+                                    {'app_name': 'unknown',
+                                     'template_name': 'my_template',
+                                     'text': 'text'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('app_name', response.json())
+
+    @mock.patch('slack_integration.api.async_views.'
+                'AsyncCustomSlackWebClient')
+    def test_slack_response_is_relayed(self, client_class_mock):
+        async def post_message(message_text):
+            return mock.Mock(status_code=200, data={'ok': True})
+
+        client_class_mock.return_value.post_message = post_message
+        self._authenticate('dev')
+
+        response = self.client.post(self.tested_url,
+                                    {'app_name': 'my_app',
+                                     'template_name': 'my_template',
+                                     'text': 'text'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'ok': True})
+
+
+class BulkPostSlackMessageViewTest(APITestCase):
+    fixtures = ('test_dump.json',)
+    tested_url = reverse('slack-message-bulk')
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.get(username='dev')
+        token = Token.objects.get_or_create(user=user)[0]
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def test_unknown_names_are_reported_per_message(self):
+        data = {'messages': [
+            {'app_name': 'my_app', 'template_name': 'my_template',
+             'text': 'text'},
+            {'app_name': 'unknown', 'template_name': 'my_template',
+             'text': 'text'},
+            {'app_name': 'my_app', 'template_name': 'unknown',
+             'text': 'text'},
+        ]}
+        response = self.client.post(self.tested_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['messages'][0], {})
+        self.assertIn('app_name', response.data['messages'][1])
+        self.assertIn('template_name', response.data['messages'][2])
+
+    @mock.patch('slack_integration.api.views.group')
+    def test_messages_are_enqueued_in_chunks(self, group_mock):
+        group_mock.return_value.apply_async.return_value.id = 'batch'
+        data = {'messages': [
+            {'app_name': 'my_app', 'template_name': 'my_template',
+             'text': f'text {i}'} for i in range(3)
+        ]}
+
+        with self.settings(SLACK_BULK_CHUNK_SIZE=2):
+            response = self.client.post(self.tested_url, data,
+                                        format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data, {'batch_id': 'batch', 'total': 3})
+        self.assertEqual(len(list(group_mock.call_args[0][0])), 2)
+        self.assertTrue(caches.is_slack_message_batch('batch'))
+
+
+@mock.patch('slack_integration.api.views.GroupResult.restore')
+class BulkPostSlackMessageStatusViewTest(APITestCase):
+    fixtures = ('test_dump.json',)
+    tested_url = reverse('slack-message-bulk-status', args=('batch',))
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.get(username='dev')
+        token = Token.objects.get_or_create(user=user)[0]
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def test_results_are_relayed_in_order(self, restore_mock):
+        caches.add_slack_message_batch('batch')
+        chunk_results = [mock.Mock(result=[{'index': 2}]),
+                         mock.Mock(result=[{'index': 0}, {'index': 1}])]
+        restore_mock.return_value.results = chunk_results
+        restore_mock.return_value.ready.return_value = True
+
+        response = self.client.get(self.tested_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'],
+                         [{'index': 0}, {'index': 1}, {'index': 2}])
+
+    def test_not_bulk_post_group_is_not_found(self, restore_mock):
+        response = self.client.get(self.tested_url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        restore_mock.assert_not_called()
+
+
+@override_settings(SLACK_CRONTAB_FANOUT=False)
+class BulkTemplateCrontabViewTest(APITestCase):
+    fixtures = ('test_dump.json',)
+    tested_url = reverse('template-crontab-bulk')
+    crontab = {'minute': '30', 'hour': '9', 'day_of_week': '*',
+               'day_of_month': '*', 'month_of_year': '*'}
+
+    def setUp(self):
+        user = User.objects.get(username='admin')
+        token = Token.objects.get_or_create(user=user)[0]
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+
+    def test_templates_are_scheduled_in_bulk(self):
+        data = {'templates': [5], 'crontab': self.crontab}
+        with CaptureQueriesContext(connection) as one_template_queries:
+            self.client.post(self.tested_url, data, format='json')
+
+        data = {'templates': [7, 8], 'crontab': self.crontab}
+        with CaptureQueriesContext(connection) as two_templates_queries:
+            response = self.client.post(self.tested_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLessEqual(len(two_templates_queries),
+                             len(one_template_queries))
+        self.assertEqual(PeriodicTask.objects.filter(
+            templates__in=(5, 7, 8), crontab__hour='9').count(), 3)
+
+    def test_scheduled_template_is_reported(self):
+        data = {'templates': [1, 5], 'crontab': self.crontab}
+
+        response = self.client.post(self.tested_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['templates'][1], {})
+        self.assertFalse(PeriodicTask.objects.filter(
+            name='app_id:3|template_id:5').exists())
+
+    def test_crontab_is_updated_in_bulk(self):
+        data = {'templates': [1], 'crontab': self.crontab}
+
+        response = self.client.put(self.tested_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(PeriodicTask.objects.get(pk=2).crontab.hour, '9')
+
+    def test_crontabs_are_deleted_in_bulk(self):
+        response = self.client.delete(self.tested_url, {'templates': [1]},
+                                      format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(PeriodicTask.objects.filter(pk=2).exists())
+
+
+@override_settings(SLACK_SIGNATURE_VERIFICATION=False)
+@mock.patch('slack_integration.tasks.post_request.delay')
+class SlackEventsViewTest(APITestCase):
+    fixtures = ('test_dump.json',)
+    tested_url = '/api/events/'
+
+    def setUp(self):
+        cache.clear()
+
+    def _post_event(self, thread_ts, channel_id='C014MGW6QUE'):
+        return self.client.post(self.tested_url,
+                                {'event': {'channel': channel_id,
+                                           'thread_ts': thread_ts}},
+                                format='json')
+
+    def test_subscribed_thread_event_is_delivered(self, delay_mock):
+        response = self._post_event('1593606523.001500')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        delay_mock.assert_called_once_with('https://postman-echo.com/post',
+                                           mock.ANY)
+
+    def test_unknown_thread_is_cached(self, delay_mock):
+        self._post_event('1111111111.000000')
+
+        with self.assertNumQueries(0):
+            response = self._post_event('1111111111.000000')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        delay_mock.assert_not_called()
+
+    def test_indexed_thread_is_not_queried(self, delay_mock):
+        self.assertTrue(caches.build_thread_ts_index())
+
+        # Only the callback settings of the template are queried
+        with self.assertNumQueries(1):
+            self._post_event('1593606523.001500')
+
+        self.assertEqual(delay_mock.call_count, 1)
+
+    def test_evicted_thread_is_queried(self, delay_mock):
+        caches.build_thread_ts_index()
+        cache.delete(caches.THREAD_TS_KEY.format(channel_id='C014MGW6QUE',
+                                                 ts='1593606523.001500'))
+
+        self._post_event('1593606523.001500')
+
+        self.assertEqual(delay_mock.call_count, 1)
+
+    def test_thread_of_another_channel_is_not_delivered(self, delay_mock):
+        self._post_event('1593606523.001500', channel_id='C0OTHER')
+
+        delay_mock.assert_not_called()
+
+    def test_new_message_timestamp_is_indexed(self, delay_mock):
+        self._post_event('1600000000.000100')
+        MessageTimeStamp.objects.create(template_id=1,
+                                        channel_id='C014MGW6QUE',
+                                        ts='1600000000.000100')
+
+        self._post_event('1600000000.000100')
+
+        self.assertEqual(delay_mock.call_count, 1)
+
+    def test_retried_event_is_not_delivered_again(self, delay_mock):
+        data = {'event_id': 'Ev01',
+                'event': {'channel': 'C014MGW6QUE',
+                          'thread_ts': '1593606523.001500'}}
+        self.client.post(self.tested_url, data, format='json')
+
+        with self.assertNumQueries(0):
+            response = self.client.post(self.tested_url, data, format='json',
+                                        HTTP_X_SLACK_RETRY_NUM='1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(delay_mock.call_count, 1)
+
+    def test_retried_event_is_delivered_if_enqueue_failed(self, delay_mock):
+        delay_mock.side_effect = [ConnectionError, None]
+        data = {'event_id': 'Ev01',
+                'event': {'channel': 'C014MGW6QUE',
+                          'thread_ts': '1593606523.001500'}}
+        with self.assertRaises(ConnectionError):
+            self.client.post(self.tested_url, data, format='json')
+
+        response = self.client.post(self.tested_url, data, format='json',
+                                    HTTP_X_SLACK_RETRY_NUM='1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(delay_mock.call_count, 2)
+
+    def test_unsubscribed_template_event_is_not_delivered(self, delay_mock):
+        template_obj = Template.objects.get(pk=1)
+        template_obj.thread_subscription = False
+        template_obj.save()
+
+        self._post_event('1593606523.001500')
+
+        delay_mock.assert_not_called()
+
+
+class AsyncSlackEventsViewTest(SlackEventsViewTest):
+    tested_url = '/api/async/events/'
+
+
+class AsyncSlackEventsConcurrencyTest(SimpleTestCase):
+    def test_events_are_processed_concurrently(self):
+        # Both events have to be marked at the same time to pass it
+        barrier = threading.Barrier(2, timeout=5)
+
+        def mark_event_received(event_id):
+            barrier.wait()
+            return True
+
+        view = AsyncSlackEventsView.as_view()
+        requests = [
+            RequestFactory().post('/api/async/events/',
+                                  json.dumps({'event_id': event_id,
+                                              'event': {}}),
+                                  content_type='application/json')
+            for event_id in ('Ev01', 'Ev02')]
+
+        async def post_events():
+            return await asyncio.gather(*(view(request)
+                                          for request in requests))
+
+        with mock.patch('slack_integration.caches.mark_event_received',
+                        side_effect=mark_event_received):
+            responses = asyncio.run(post_events())
+
+        self.assertEqual([response.status_code for response in responses],
+                         [status.HTTP_200_OK, status.HTTP_200_OK])
+
+
+@override_settings(SLACK_SIGNATURE_VERIFICATION=False)
+@mock.patch('slack_integration.tasks.post_request.delay')
+class InteractivityProcessingViewTest(APITestCase):
+    fixtures = ('test_dump.json',)
+    tested_url = '/api/interactivity/'
+
+    def setUp(self):
+        cache.clear()
+
+    def _post_action(self, block_id):
+        payload = json.dumps({'actions': [{'block_id': block_id}]})
+        return self.client.post(self.tested_url, {'payload': payload})
+
+    def test_subscribed_block_action_is_delivered_once_queried(self,
+                                                               delay_mock):
+        self._post_action('dsf')
+
+        with self.assertNumQueries(0):
+            response = self._post_action('dsf')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(delay_mock.call_count, 2)
+
+    def test_unknown_block_id_is_cached(self, delay_mock):
+        self._post_action('unknown')
+
+        with self.assertNumQueries(0):
+            self._post_action('unknown')
+
+        delay_mock.assert_not_called()
+
+    def test_block_id_change_invalidates_cache(self, delay_mock):
+        self._post_action('dsf')
+        actions_block = ActionsBlock.objects.get(block_id='dsf')
+        actions_block.block_id = 'new_block_id'
+        actions_block.save()
+
+        self._post_action('dsf')
+        self._post_action('new_block_id')
+
+        self.assertEqual(delay_mock.call_count, 2)
+
+
+class AsyncInteractivityProcessingViewTest(InteractivityProcessingViewTest):
+    tested_url = '/api/async/interactivity/'
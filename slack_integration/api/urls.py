@@ -1,15 +1,39 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from slack_integration.middleware import slack_signature_required
+
+from . import async_views, views
 
 
 urlpatterns = [
     path('message/', views.CreateUpdateDestroySlackMessageView.as_view(),
          name='slack-message'),
-    path('interactivity/', views.InteractivityProcessingView.as_view()),
-    path('events/', views.SlackEventsView.as_view()),
+    path('message/jobs/<job_id>/', views.SlackMessageJobView.as_view(),
+         name='slack-message-job'),
+    path('message/queues/', views.SlackQueueDepthView.as_view(),
+         name='slack-message-queues'),
+    path('message/bulk/', views.BulkPostSlackMessageView.as_view(),
+         name='slack-message-bulk'),
+    path('message/bulk/<batch_id>/',
+         views.BulkPostSlackMessageStatusView.as_view(),
+         name='slack-message-bulk-status'),
+    path('async/message/',
+         async_views.AsyncCreateUpdateDestroySlackMessageView.as_view(),
+         name='slack-message-async'),
+    path('async/interactivity/',
+         slack_signature_required(
+             async_views.AsyncInteractivityProcessingView.as_view())),
+    path('async/events/',
+         slack_signature_required(async_views.AsyncSlackEventsView.as_view())),
+    path('interactivity/',
+         slack_signature_required(
+             views.InteractivityProcessingView.as_view())),
+    path('events/',
+         slack_signature_required(views.SlackEventsView.as_view())),
     path('templates/<pk>/crontab/', views.TemplateCrontabView.as_view()),
+    path('templates/crontab/bulk/', views.BulkTemplateCrontabView.as_view(),
+         name='template-crontab-bulk'),
 ]
 
 router = DefaultRouter()
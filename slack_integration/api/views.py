@@ -1,7 +1,10 @@
 import json
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from django.urls import reverse
 
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
@@ -9,38 +12,68 @@ from rest_framework import generics
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import Throttled
 
-from django_celery_beat.models import PeriodicTask
+from celery import group
+from celery.result import AsyncResult, GroupResult
 
-from slack_integration import models
-from slack_integration.tasks import post_request
+from slack_integration import (caches, event_stream, metrics, models,
+                               schedules, tasks)
+from slack_integration.tasks import deliver_callback, post_messages
+from slack_integration_service.celery import app
 
 from . import serializers
-from .permissions import IsDeveloper
+from .permissions import IsAdmin, IsDeveloper
 from .mixins.views.get_permissions import AdminDeveloperPermissionsMixin
+from .mixins.views.get_queryset import GetQuerysetListMixin
 from .mixins.views.get_serializer_class import GetSerializerClassListMixin
 from .mixins.views.crontab_view import (RetrieveMixin, UpdateMixin,
                                         CreateMixin, DestroyMixin)
+from .slack_rate_limiter import SlackRateLimited, slack_rate_limiter
 from .slack_web_client import CustomSlackWebClient
+from .slack_web_client_registry import slack_web_client_registry
 
 
 class SlackApplicationViewSet(AdminDeveloperPermissionsMixin,
+                              GetQuerysetListMixin,
                               GetSerializerClassListMixin,
                               ModelViewSet):
-    queryset = models.SlackApplication.objects.all()
+    queryset = models.SlackApplication.objects.prefetch_related(
+                   Prefetch('templates',
+                            queryset=models.Template.objects.only(
+                                'id', 'application_id')))
     serializer_class = serializers.SlackApplicationSerializer
 
+    querysets_dict = {
+        'list': models.SlackApplication.objects.all(),
+    }
     serializers_dict = {
         'list': serializers.SlackApplicationBaseSerializer,
     }
 
+    def perform_update(self, serializer):
+        old_token = serializer.instance.bot_user_oauth_access_token
+        app_obj = serializer.save()
+
+        if app_obj.bot_user_oauth_access_token != old_token:
+            slack_web_client_registry.invalidate(app_obj.id)
+
+    def perform_destroy(self, instance):
+        app_id = instance.id
+        instance.delete()
+        slack_web_client_registry.invalidate(app_id)
+
 
 class TemplateViewSet(AdminDeveloperPermissionsMixin,
+                      GetQuerysetListMixin,
                       GetSerializerClassListMixin,
                       ModelViewSet):
-    queryset = models.Template.objects.all()
+    queryset = models.Template.objects.select_related('actions_block')
     serializer_class = serializers.TemplateSerializer
 
+    querysets_dict = {
+        'list': models.Template.objects.all(),
+    }
     serializers_dict = {
         'list': serializers.TemplateBaseSerializer,
     }
@@ -53,7 +86,7 @@ class TemplateCrontabView(RetrieveMixin,
                           AdminDeveloperPermissionsMixin,
                           generics.GenericAPIView):
     serializer_class = serializers.CrontabScheduleSerializer
-    queryset = models.Template.objects.all()
+    queryset = models.Template.objects.select_related('periodic_task__crontab')
 
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
@@ -71,13 +104,7 @@ class TemplateCrontabView(RetrieveMixin,
         return self.partial_update(request, *args, **kwargs)
 
     def _get_periodic_task_obj_if_exists(self, template_obj):
-        app_id, template_id = self._get_periodic_task_name_data(
-                                    template_obj).values()
-        try:
-            return PeriodicTask.objects.get(
-                name=f'app_id:{app_id}|template_id:{template_id}')
-        except ObjectDoesNotExist:
-            return None
+        return schedules.get_periodic_task(template_obj)
 
     def _get_crontab_obj_if_periodic_task_exists(self, template_obj):
         periodic_task = self._get_periodic_task_obj_if_exists(template_obj)
@@ -85,26 +112,66 @@ class TemplateCrontabView(RetrieveMixin,
         if periodic_task:
             return periodic_task.crontab
 
-    def _get_periodic_task_name_data(self, template_obj):
-        app_id = template_obj.application.id
-        template_id = template_obj.id
 
-        return {'app_id': app_id, 'template_id': template_id}
+class BulkTemplateCrontabView(AdminDeveloperPermissionsMixin,
+                              generics.GenericAPIView):
+    """
+    Creates, updates or deletes the crontab of many templates at once.
+    """
+    serializer_class = serializers.BulkTemplateCrontabSerializer
+
+    def post(self, request):
+        return self._schedule(request, status.HTTP_201_CREATED)
+
+    def put(self, request):
+        return self._schedule(request, status.HTTP_200_OK)
+
+    @transaction.atomic
+    def delete(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        schedules.unschedule_templates(
+            serializer.validated_data['templates'])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @transaction.atomic
+    def _schedule(self, request, status_code):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        template_objs = serializer.validated_data['templates']
+        crontab_obj = serializers.CrontabScheduleSerializer().create(
+                          dict(serializer.validated_data['crontab']))
+        schedules.schedule_templates(template_objs, crontab_obj)
+
+        return Response(
+            {'templates': [template_obj.id for template_obj in template_objs],
+             'crontab': serializers.CrontabScheduleSerializer(
+                            crontab_obj).data},
+            status=status_code)
 
 
 class ActionsBlockViewSet(AdminDeveloperPermissionsMixin,
+                          GetQuerysetListMixin,
                           GetSerializerClassListMixin,
                           ModelViewSet):
-    queryset = models.ActionsBlock.objects.all()
+    queryset = models.ActionsBlock.objects.prefetch_related(
+                   Prefetch('buttons',
+                            queryset=models.Button.objects.only(
+                                'id', 'actions_block_id')))
     serializer_class = serializers.ActionsBlockSerializer
 
+    querysets_dict = {
+        'list': models.ActionsBlock.objects.all(),
+    }
     serializers_dict = {
         'list': serializers.ActionsBlockBaseSerializer,
     }
 
 
 class ButtonViewSet(AdminDeveloperPermissionsMixin, ModelViewSet):
-    queryset = models.Button.objects.all()
+    queryset = models.Button.objects.select_related('actions_block')
     serializer_class = serializers.ButtonSerializer
 
 
@@ -112,6 +179,11 @@ class CreateUpdateDestroySlackMessageView(APIView):
     """
     Works with the Slack API. Delegates requests to Slack API
     and relays answers from it.
+
+    In the async mode (`?async=true` or `Prefer: respond-async` header)
+    the request is delegated to a Celery task and the id of the job
+    is returned at once. The answer of Slack API can be received
+    from `SlackMessageJobView`.
     """
     permission_classes = (IsDeveloper,)
 
@@ -121,11 +193,12 @@ class CreateUpdateDestroySlackMessageView(APIView):
 
         valid_data = serializer.validated_data
 
-        app_obj = get_object_or_404(models.SlackApplication,
-                                    name=valid_data['app_name'])
-        template_obj = get_object_or_404(models.Template,
-                                         name=valid_data['template_name'],
-                                         application=app_obj)
+        app_obj = valid_data['app_obj']
+        template_obj = valid_data['template_obj']
+
+        if self._is_async_request(request):
+            return self._enqueue(tasks.post_message, app_obj.id,
+                                 template_obj.id, valid_data['text'])
 
         slack_web_client = CustomSlackWebClient(app_obj, template_obj)
 
@@ -140,11 +213,13 @@ class CreateUpdateDestroySlackMessageView(APIView):
 
         valid_data = serializer.validated_data
 
-        app_obj = get_object_or_404(models.SlackApplication,
-                                    name=valid_data['app_name'])
-        template_obj = get_object_or_404(models.Template,
-                                         name=valid_data['template_name'],
-                                         application=app_obj)
+        app_obj = valid_data['app_obj']
+        template_obj = valid_data['template_obj']
+
+        if self._is_async_request(request):
+            return self._enqueue(tasks.update_message, app_obj.id,
+                                 template_obj.id, valid_data['text'],
+                                 valid_data['ts'])
 
         slack_web_client = CustomSlackWebClient(app_obj, template_obj)
 
@@ -160,8 +235,11 @@ class CreateUpdateDestroySlackMessageView(APIView):
 
         valid_data = serializer.validated_data
 
-        app_obj = get_object_or_404(models.SlackApplication,
-                                    name=valid_data['app_name'])
+        app_obj = valid_data['app_obj']
+
+        if self._is_async_request(request):
+            return self._enqueue(tasks.delete_message, app_obj.id,
+                                 valid_data['channel_id'], valid_data['ts'])
 
         slack_web_client = CustomSlackWebClient(
                                app_obj,
@@ -172,6 +250,152 @@ class CreateUpdateDestroySlackMessageView(APIView):
         return Response(slack_response.data,
                         status=slack_response.status_code)
 
+    def handle_exception(self, exc):
+        if isinstance(exc, SlackRateLimited):
+            exc = Throttled(wait=exc.retry_after)
+
+        return super().handle_exception(exc)
+
+    def _is_async_request(self, request):
+        async_param = request.query_params.get('async', '').lower()
+        prefer_header = request.headers.get('Prefer', '')
+
+        return (async_param in ('1', 'true', 'yes') or
+                'respond-async' in prefer_header)
+
+    def _enqueue(self, task, *args):
+        async_result = task.delay(*args)
+        caches.add_slack_message_job(async_result.id)
+        job_url = reverse('slack-message-job', args=(async_result.id,))
+
+        return Response({'job_id': async_result.id},
+                        status=status.HTTP_202_ACCEPTED,
+                        headers={'Location': job_url})
+
+
+class SlackMessageJobView(APIView):
+    """
+    Relays the stored answer of Slack API for the job
+    created in the async mode of `CreateUpdateDestroySlackMessageView`.
+    """
+    permission_classes = (IsDeveloper,)
+
+    def get(self, request, job_id):
+        # Celery reports the unknown jobs as pending
+        if not caches.is_slack_message_job(job_id):
+            return self._get_not_found_response()
+
+        async_result = AsyncResult(job_id, app=app)
+
+        if async_result.successful():
+            slack_result = async_result.result
+            if (not isinstance(slack_result, dict) or
+                    slack_result.keys() != {'status_code', 'data'}):
+                return self._get_not_found_response()
+
+            return Response(slack_result['data'],
+                            status=slack_result['status_code'])
+
+        if async_result.failed():
+            return Response({'job_id': job_id, 'status': async_result.state},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # The job is not finished yet
+        return Response({'job_id': job_id, 'status': async_result.state},
+                        status=status.HTTP_202_ACCEPTED)
+
+    @staticmethod
+    def _get_not_found_response():
+        error = {'job_id': 'job with this id does not exist'}
+        return Response(error, status=status.HTTP_404_NOT_FOUND)
+
+
+class SlackQueueDepthView(APIView):
+    """
+    Shows the number of jobs postponed by the Slack rate limits
+    per application and channel.
+    """
+    permission_classes = (IsDeveloper,)
+
+    def get(self, request):
+        return Response(slack_rate_limiter.get_queue_depths())
+
+
+class BulkPostSlackMessageView(APIView):
+    """
+    Accepts a list of messages and posts them to Slack API
+    in chunks through Celery. Returns the batch id to poll the results.
+    """
+    permission_classes = (IsDeveloper,)
+
+    def post(self, request):
+        serializer = serializers.BulkPostMessageSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        messages = [
+            {'index': index,
+             'template_id': message['template_obj'].id,
+             'text': message['text']}
+            for index, message in enumerate(
+                serializer.validated_data['messages'])
+        ]
+
+        chunk_size = settings.SLACK_BULK_CHUNK_SIZE
+        group_result = group(
+            post_messages.s(messages[i:i + chunk_size])
+            for i in range(0, len(messages), chunk_size)
+        ).apply_async()
+        group_result.save()
+        caches.add_slack_message_batch(group_result.id)
+
+        return Response({'batch_id': group_result.id,
+                         'total': len(messages)},
+                        status=status.HTTP_202_ACCEPTED)
+
+
+class BulkPostSlackMessageStatusView(APIView):
+    """
+    Relays the Slack API answers of the already posted
+    messages of the batch.
+    """
+    permission_classes = (IsDeveloper,)
+
+    def get(self, request, batch_id):
+        group_result = None
+        if caches.is_slack_message_batch(batch_id):
+            group_result = GroupResult.restore(batch_id, app=app)
+        if group_result is None:
+            error = {'batch_id': 'batch with this id does not exist'}
+            return Response(error, status=status.HTTP_404_NOT_FOUND)
+
+        results = []
+        failed_chunks = 0
+        for chunk_result in group_result.results:
+            if chunk_result.successful():
+                results.extend(chunk_result.result)
+            elif chunk_result.failed():
+                failed_chunks += 1
+
+        results.sort(key=lambda result: result['index'])
+
+        return Response({'batch_id': batch_id,
+                         'ready': group_result.ready(),
+                         'completed': len(results),
+                         'failed_chunks': failed_chunks,
+                         'results': results})
+
+
+class MetricsView(APIView):
+    # Scraped with the token of an administrator
+    permission_classes = (IsAdmin,)
+
+    def get(self, request):
+        """
+        Returns the metrics of all the processes in Prometheus format.
+        """
+        return HttpResponse(metrics.generate_latest(),
+                            content_type=metrics.CONTENT_TYPE)
+
 
 class InteractivityProcessingView(APIView):
     permission_classes = (AllowAny,)
@@ -188,14 +412,11 @@ class InteractivityProcessingView(APIView):
         # if the block_id is not None, then there was an interaction
         # with any button from the actions block
         if block_id:
-            try:
-                actions_block_obj = models.ActionsBlock.objects.get(
-                                        action_subscription=True,
-                                        block_id=block_id)
-                callback_url = actions_block_obj.callback_url
-                post_request.delay(callback_url, request.data)
-            except ObjectDoesNotExist:
-                pass
+            callback = caches.get_actions_block_subscription(block_id)
+            if callback:
+                deliver_callback(callback['callback_url'], request.data,
+                                 callback['callback_max_batch_size'],
+                                 callback['callback_max_linger_ms'])
 
         return Response(status=status.HTTP_200_OK)
 
@@ -208,19 +429,39 @@ class SlackEventsView(APIView):
         Receives events data from Slack.
         """
         data = request.data
-        thread_ts = data.get('event').get('thread_ts')
+
+        # Slack retries the events not acknowledged in time
+        event_id = data.get('event_id')
+        if event_id and not caches.mark_event_received(event_id):
+            return Response(status=status.HTTP_200_OK, data=data)
+
+        try:
+            self._handle_event(data)
+        except Exception:
+            # The event is not lost, Slack retries it
+            if event_id:
+                caches.unmark_event_received(event_id)
+            raise
+
+        return Response(status=status.HTTP_200_OK, data=data)
+
+    @staticmethod
+    def _handle_event(data):
+        if settings.SLACK_EVENTS_INGESTION_MODE == 'stream':
+            event_stream.append_event(data)
+            return
+
+        event = data.get('event')
+        thread_ts = event.get('thread_ts')
 
         # if an event is a thread message, the thread_ts is not None.
         if thread_ts:
             # get a template if its thread subs flag is True
             # and an object with the corresponding thread_ts exists.
-            try:
-                template_obj = models.Template.objects.get(
-                               thread_subscription=True,
-                               message_timestamps__ts=thread_ts)
-                callback_url = template_obj.callback_url
-                post_request.delay(callback_url, data)
-            except ObjectDoesNotExist:
-                pass
-
-        return Response(status=status.HTTP_200_OK, data=request.data)
+            thread_subscription = caches.get_thread_subscription(
+                                      event.get('channel'), thread_ts)
+            if thread_subscription:
+                deliver_callback(
+                    thread_subscription['callback_url'], data,
+                    thread_subscription['callback_max_batch_size'],
+                    thread_subscription['callback_max_linger_ms'])
@@ -0,0 +1,297 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from slack_integration.models import Template, MessageTimeStamp, ActionsBlock
+
+
+TEMPLATE_PAYLOAD_KEY = 'template_payload:{template_id}'
+SEND_PLAN_KEY = 'send_plan:{template_id}'
+THREAD_TS_KEY = 'thread_ts:{channel_id}:{ts}'
+THREAD_TS_INDEX_LOCK_KEY = 'thread_ts_index:lock'
+THREAD_SUBSCRIPTION_KEY = 'thread_subscription:{template_id}'
+ACTIONS_BLOCK_KEY = 'actions_block:{block_id}'
+SLACK_EVENT_KEY = 'slack_event:{event_id}'
+SLACK_MESSAGE_JOB_KEY = 'slack_message_job:{job_id}'
+SLACK_MESSAGE_BATCH_KEY = 'slack_message_batch:{batch_id}'
+USER_GROUPS_KEY = 'user_groups:{user_id}'
+AUTH_TOKEN_KEY = 'auth_token:{key_hash}'
+
+THREAD_TS_INDEX_BUILD_CHUNK_SIZE = 1000
+# Bumped when the format of the send plans is changed
+SEND_PLAN_VERSION = 1
+
+
+def get_template_payload(template_id):
+    """
+    Returns the prebuilt message skeleton of the template
+    or None if it is not cached.
+    """
+    return cache.get(TEMPLATE_PAYLOAD_KEY.format(template_id=template_id))
+
+
+def set_template_payload(template_id, payload):
+    cache.set(TEMPLATE_PAYLOAD_KEY.format(template_id=template_id),
+              payload,
+              timeout=settings.TEMPLATE_PAYLOAD_CACHE_TIMEOUT)
+
+
+def invalidate_template_payload(template_id):
+    cache.delete(TEMPLATE_PAYLOAD_KEY.format(template_id=template_id))
+    # The send plan contains the payload as well
+    invalidate_send_plans(template_id)
+
+
+def get_send_plan(template_id):
+    """
+    Returns the send plan of the scheduled messages
+    of the template or None if it is not cached.
+    """
+    return cache.get(SEND_PLAN_KEY.format(template_id=template_id),
+                     version=SEND_PLAN_VERSION)
+
+
+def set_send_plan(template_id, send_plan):
+    cache.set(SEND_PLAN_KEY.format(template_id=template_id),
+              send_plan,
+              timeout=settings.TEMPLATE_PAYLOAD_CACHE_TIMEOUT,
+              version=SEND_PLAN_VERSION)
+
+
+def invalidate_send_plans(*template_ids):
+    cache.delete_many([SEND_PLAN_KEY.format(template_id=template_id)
+                       for template_id in template_ids],
+                      version=SEND_PLAN_VERSION)
+
+
+CALLBACK_FIELDS = ('callback_url', 'callback_max_batch_size',
+                   'callback_max_linger_ms')
+
+
+def get_thread_subscription(channel_id, thread_ts):
+    """
+    Returns the dict with `template_id` and the callback settings
+    (`CALLBACK_FIELDS`) of the template subscribed to the thread
+    or None if there is no such template. The threads are looked up
+    in the cached `channel and ts -> template id` index first,
+    the misses are queried and cached, unknown threads only for
+    `THREAD_TS_NEGATIVE_CACHE_TIMEOUT` seconds.
+    """
+    key = THREAD_TS_KEY.format(channel_id=channel_id, ts=thread_ts)
+    template_id = cache.get(key)
+
+    if template_id is None:
+        template_id = MessageTimeStamp.objects.filter(
+            channel_id=channel_id, ts=thread_ts).values_list(
+                'template_id', flat=True).first()
+        if template_id is None:
+            # A message could be posted to the thread meanwhile
+            cache.add(key, 0,
+                      timeout=settings.THREAD_TS_NEGATIVE_CACHE_TIMEOUT)
+        else:
+            cache.set(key, template_id, timeout=None)
+
+    if not template_id:
+        return None
+
+    callback = _get_thread_subscription_callback(template_id)
+    if not callback:
+        return None
+
+    return {'template_id': template_id, **callback}
+
+
+def build_thread_ts_index():
+    """
+    Fills the `channel and ts -> template id` index from the database,
+    so the thread events do not query it. Returns False if the index
+    is being built by another process.
+    """
+    if not cache.add(THREAD_TS_INDEX_LOCK_KEY, True,
+                     timeout=settings.THREAD_TS_INDEX_BUILD_LOCK_TIMEOUT):
+        return False
+
+    try:
+        timestamps = MessageTimeStamp.objects.values_list(
+                         'channel_id', 'ts', 'template_id').iterator(
+                             chunk_size=THREAD_TS_INDEX_BUILD_CHUNK_SIZE)
+
+        chunk = {}
+        for channel_id, ts, template_id in timestamps:
+            chunk[THREAD_TS_KEY.format(channel_id=channel_id,
+                                       ts=ts)] = template_id
+            if len(chunk) == THREAD_TS_INDEX_BUILD_CHUNK_SIZE:
+                cache.set_many(chunk, timeout=None)
+                chunk = {}
+        cache.set_many(chunk, timeout=None)
+    finally:
+        cache.delete(THREAD_TS_INDEX_LOCK_KEY)
+
+    return True
+
+
+def add_thread_ts(channel_id, ts, template_id):
+    cache.set(THREAD_TS_KEY.format(channel_id=channel_id, ts=ts),
+              template_id, timeout=None)
+
+
+def remove_thread_ts(*messages):
+    """
+    Removes the `(channel_id, ts)` pairs of the messages
+    from the index.
+    """
+    cache.delete_many([THREAD_TS_KEY.format(channel_id=channel_id, ts=ts)
+                       for channel_id, ts in messages])
+
+
+def invalidate_thread_subscription(template_id):
+    cache.delete(THREAD_SUBSCRIPTION_KEY.format(template_id=template_id))
+
+
+def _get_thread_subscription_callback(template_id):
+    """
+    Returns the callback settings of the template or the empty dict
+    if the template is not subscribed to threads.
+    """
+    key = THREAD_SUBSCRIPTION_KEY.format(template_id=template_id)
+    callback = cache.get(key)
+
+    if callback is None:
+        template_data = Template.objects.filter(pk=template_id).values(
+                            'thread_subscription', *CALLBACK_FIELDS).first()
+        if (template_data and template_data['thread_subscription'] and
+                template_data['callback_url']):
+            callback = {field: template_data[field]
+                        for field in CALLBACK_FIELDS}
+        else:
+            callback = {}
+        cache.set(key, callback, timeout=None)
+
+    return callback
+
+
+def get_actions_block_subscription(block_id):
+    """
+    Returns the callback settings (`CALLBACK_FIELDS`) of the actions
+    block subscribed to the actions or None. Unknown block ids
+    are cached as well, but only for
+    `ACTIONS_BLOCK_NEGATIVE_CACHE_TIMEOUT` seconds.
+    """
+    key = ACTIONS_BLOCK_KEY.format(block_id=block_id)
+    callback = cache.get(key)
+
+    if callback is None:
+        actions_block_data = ActionsBlock.objects.filter(
+            block_id=block_id).values('action_subscription',
+                                      *CALLBACK_FIELDS).first()
+        timeout = None
+        if actions_block_data is None:
+            callback = {}
+            timeout = settings.ACTIONS_BLOCK_NEGATIVE_CACHE_TIMEOUT
+        elif (actions_block_data['action_subscription'] and
+                actions_block_data['callback_url']):
+            callback = {field: actions_block_data[field]
+                        for field in CALLBACK_FIELDS}
+        else:
+            callback = {}
+        cache.set(key, callback, timeout=timeout)
+
+    return callback or None
+
+
+def invalidate_actions_block(*block_ids):
+    cache.delete_many([ACTIONS_BLOCK_KEY.format(block_id=block_id)
+                       for block_id in block_ids])
+
+
+def mark_event_received(event_id):
+    """
+    Returns False if the event was already received within
+    `SLACK_EVENTS_DEDUP_TIMEOUT` seconds, e.g. it is retried by Slack.
+    """
+    return cache.add(SLACK_EVENT_KEY.format(event_id=event_id), True,
+                     timeout=settings.SLACK_EVENTS_DEDUP_TIMEOUT)
+
+
+def unmark_event_received(event_id):
+    """
+    Forgets the event, so its retry by Slack is processed again.
+    """
+    cache.delete(SLACK_EVENT_KEY.format(event_id=event_id))
+
+
+def add_slack_message_job(job_id):
+    """
+    Remembers the id of the job enqueued by the message views,
+    so only such jobs are relayed by the job view.
+    """
+    cache.set(SLACK_MESSAGE_JOB_KEY.format(job_id=job_id), True,
+              timeout=settings.SLACK_MESSAGE_JOBS_TIMEOUT)
+
+
+def is_slack_message_job(job_id):
+    return bool(cache.get(SLACK_MESSAGE_JOB_KEY.format(job_id=job_id)))
+
+
+def add_slack_message_batch(batch_id):
+    """
+    Remembers the id of the group created by the bulk post view,
+    so the status view does not relay any other groups.
+    """
+    cache.set(SLACK_MESSAGE_BATCH_KEY.format(batch_id=batch_id), True,
+              timeout=settings.SLACK_MESSAGE_JOBS_TIMEOUT)
+
+
+def is_slack_message_batch(batch_id):
+    return bool(cache.get(
+        SLACK_MESSAGE_BATCH_KEY.format(batch_id=batch_id)))
+
+
+def get_user_group_names(user):
+    """
+    Returns the names of the groups of the user. They are cached
+    per user and memoized on the user object for the request.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    group_names = getattr(user, '_group_names', None)
+    if group_names is None:
+        key = USER_GROUPS_KEY.format(user_id=user.pk)
+        group_names = cache.get(key)
+        if group_names is None:
+            group_names = frozenset(user.groups.values_list('name',
+                                                            flat=True))
+            cache.set(key, group_names,
+                      timeout=settings.USER_GROUPS_CACHE_TIMEOUT)
+        user._group_names = group_names
+
+    return group_names
+
+
+def invalidate_user_groups(*user_ids):
+    cache.delete_many([USER_GROUPS_KEY.format(user_id=user_id)
+                       for user_id in user_ids])
+
+
+def get_auth_token(key):
+    """
+    Returns the token with its user or None if it is not cached.
+    """
+    return cache.get(_get_auth_token_cache_key(key))
+
+
+def set_auth_token(token):
+    cache.set(_get_auth_token_cache_key(token.key), token,
+              timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT)
+
+
+def invalidate_auth_tokens(*keys):
+    cache.delete_many([_get_auth_token_cache_key(key) for key in keys])
+
+
+def _get_auth_token_cache_key(key):
+    # The tokens are not exposed in the cache key names
+    return AUTH_TOKEN_KEY.format(
+               key_hash=hashlib.sha256(key.encode()).hexdigest())
@@ -0,0 +1,147 @@
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django_redis import get_redis_connection
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+from urllib3.util.retry import Retry
+
+from slack_integration import metrics
+
+
+# The subscribers of the same url may accept batches of different sizes
+BATCH_KEY = 'callback_batch:{max_batch_size}:{url}'
+
+_http_session = None
+_http_session_pid = None
+
+
+class CallbackServerError(Exception):
+    """The subscriber answered with a 5xx status code."""
+
+
+class _PoolTimeoutMixin:
+    """
+    Waits for a free pooled connection at most `CALLBACK_POOL_TIMEOUT`
+    seconds, requests does not pass the pool timeout itself.
+    """
+
+    def urlopen(self, *args, **kwargs):
+        kwargs.setdefault('pool_timeout', settings.CALLBACK_POOL_TIMEOUT)
+        return super().urlopen(*args, **kwargs)
+
+
+class _HTTPConnectionPool(_PoolTimeoutMixin, HTTPConnectionPool):
+    pass
+
+
+class _HTTPSConnectionPool(_PoolTimeoutMixin, HTTPSConnectionPool):
+    pass
+
+
+class CallbackHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _HTTPConnectionPool,
+            'https': _HTTPSConnectionPool,
+        }
+
+
+def get_http_session():
+    """
+    Returns the pooled HTTP session of the current process.
+    The session is recreated in forked processes (Celery workers),
+    so the connections are never shared between processes.
+    """
+    global _http_session, _http_session_pid
+
+    if _http_session is None or _http_session_pid != os.getpid():
+        # Only the connection errors are retried in place, the request
+        # could have been processed by the subscriber on the read errors
+        retry = Retry(total=settings.CALLBACK_CONNECT_RETRIES,
+                      connect=settings.CALLBACK_CONNECT_RETRIES,
+                      read=0,
+                      method_whitelist=frozenset())
+        adapter = CallbackHTTPAdapter(
+            pool_connections=settings.CALLBACK_POOL_CONNECTIONS,
+            pool_maxsize=settings.CALLBACK_POOL_MAXSIZE,
+            pool_block=True,
+            max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        _http_session = session
+        _http_session_pid = os.getpid()
+
+    return _http_session
+
+
+def deliver(url, data):
+    """
+    Posts the data to the callback url and records the latency
+    per host. Raises `CallbackServerError` if the subscriber
+    fails with a 5xx status code and `requests.ConnectionError`
+    if no pooled connection is freed in `CALLBACK_POOL_TIMEOUT`
+    seconds.
+    """
+    host = urlsplit(url).netloc
+    started_at = time.perf_counter()
+
+    try:
+        response = get_http_session().post(
+            url,
+            json=data,
+            timeout=(settings.CALLBACK_CONNECT_TIMEOUT,
+                     settings.CALLBACK_READ_TIMEOUT))
+    except (requests.RequestException, EmptyPoolError) as error:
+        metrics.callback_request_duration.observe(
+            time.perf_counter() - started_at, host=host, status='error')
+        if isinstance(error, EmptyPoolError):
+            # The request was not sent, so it is safe to retry
+            raise requests.ConnectionError(error) from error
+        raise
+
+    metrics.callback_request_duration.observe(
+        time.perf_counter() - started_at,
+        host=host,
+        status=response.status_code)
+
+    if response.status_code >= 500:
+        raise CallbackServerError(
+            f'{url} answered with {response.status_code} status code')
+
+    return response
+
+
+def push_to_batch(url, max_batch_size, data):
+    """
+    Appends the data to the pending batch of the callback url.
+    Returns the number of the pending items.
+    """
+    return get_redis_connection().rpush(
+        BATCH_KEY.format(max_batch_size=max_batch_size, url=url),
+        json.dumps(data))
+
+
+def pop_batch(url, max_batch_size):
+    """
+    Takes up to `max_batch_size` items from the pending batch
+    of the callback url. Returns the items and the number
+    of the items left.
+    """
+    key = BATCH_KEY.format(max_batch_size=max_batch_size, url=url)
+
+    pipeline = get_redis_connection().pipeline(transaction=True)
+    pipeline.lrange(key, 0, max_batch_size - 1)
+    pipeline.ltrim(key, max_batch_size, -1)
+    pipeline.llen(key)
+    items, _, left_count = pipeline.execute()
+
+    return [json.loads(item) for item in items], left_count
@@ -0,0 +1,117 @@
+import json
+import os
+import socket
+from collections import defaultdict
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+from slack_integration.models import MessageTimeStamp
+
+
+STREAM_KEY = 'slack_events'
+CONSUMER_GROUP = 'slack_events_routers'
+
+
+def append_event(data):
+    """
+    Appends the raw Slack event to the stream
+    drained by `route_events`.
+    """
+    get_redis_connection().xadd(
+        STREAM_KEY,
+        {'event': json.dumps(data)},
+        maxlen=settings.SLACK_EVENTS_STREAM_MAXLEN,
+        approximate=True)
+
+
+def route_events(deliver):
+    """
+    Reads a batch of events from the stream, resolves all their
+    thread timestamps in one query and calls `deliver(callback_url,
+    events, max_batch_size)` once per callback url. Returns
+    the number of the handled stream entries.
+    """
+    redis_connection = get_redis_connection()
+    _create_consumer_group(redis_connection)
+
+    consumer_name = f'{socket.gethostname()}:{os.getpid()}'
+    entries = (_claim_stale_entries(redis_connection, consumer_name) or
+               _read_new_entries(redis_connection, consumer_name))
+    if not entries:
+        return 0
+
+    entry_ids = [entry_id for entry_id, _ in entries]
+    # The claimed entries could have been trimmed from the stream
+    entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+
+    events = [json.loads(fields[b'event']) for _, fields in entries]
+    thread_ts_set = {event.get('event', {}).get('thread_ts')
+                     for event in events} - {None}
+
+    callbacks = {
+        (channel_id, ts): (callback_url, max_batch_size)
+        for channel_id, ts, callback_url, max_batch_size in
+        MessageTimeStamp.objects.filter(
+            ts__in=thread_ts_set,
+            template__thread_subscription=True).exclude(
+                template__callback_url='').values_list(
+                    'channel_id', 'ts', 'template__callback_url',
+                    'template__callback_max_batch_size')
+    }
+
+    deliveries = defaultdict(list)
+    for event in events:
+        callback = callbacks.get((event.get('event', {}).get('channel'),
+                                  event.get('event', {}).get('thread_ts')))
+        if callback:
+            deliveries[callback].append(event)
+
+    for (callback_url, max_batch_size), url_events in deliveries.items():
+        deliver(callback_url, url_events, max_batch_size)
+
+    redis_connection.xack(STREAM_KEY, CONSUMER_GROUP, *entry_ids)
+    redis_connection.xdel(STREAM_KEY, *entry_ids)
+
+    return len(entry_ids)
+
+
+def _create_consumer_group(redis_connection):
+    try:
+        redis_connection.xgroup_create(STREAM_KEY, CONSUMER_GROUP,
+                                       id='0', mkstream=True)
+    except ResponseError as e:
+        # The group already exists
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def _read_new_entries(redis_connection, consumer_name):
+    response = redis_connection.xreadgroup(
+        CONSUMER_GROUP, consumer_name, {STREAM_KEY: '>'},
+        count=settings.SLACK_EVENTS_BATCH_SIZE)
+
+    return response[0][1] if response else []
+
+
+def _claim_stale_entries(redis_connection, consumer_name):
+    """
+    Takes over the entries read but not acknowledged
+    by the crashed consumers.
+    """
+    pending_entries = redis_connection.xpending_range(
+        STREAM_KEY, CONSUMER_GROUP, min='-', max='+',
+        count=settings.SLACK_EVENTS_BATCH_SIZE)
+
+    stale_entry_ids = [
+        pending_entry['message_id'] for pending_entry in pending_entries
+        if (pending_entry['time_since_delivered'] >=
+            settings.SLACK_EVENTS_CLAIM_IDLE_TIME)
+    ]
+    if not stale_entry_ids:
+        return []
+
+    return redis_connection.xclaim(STREAM_KEY, CONSUMER_GROUP, consumer_name,
+                                   settings.SLACK_EVENTS_CLAIM_IDLE_TIME,
+                                   stale_entry_ids)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from slack_integration import caches
+
+
+class Command(BaseCommand):
+    help = ('Fills the cached index of the message timestamps '
+            'used for routing the thread events.')
+
+    def handle(self, *args, **options):
+        if not caches.build_thread_ts_index():
+            self.stdout.write(self.style.WARNING(
+                'The index is being built by another process.'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('The index is built.'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from slack_integration.retention import delete_expired_message_timestamps
+
+
+class Command(BaseCommand):
+    help = ('Deletes the message timestamps older than '
+            'the retention period of their templates.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help='Number of rows deleted in one query.')
+
+    def handle(self, *args, **options):
+        deleted_count = delete_expired_message_timestamps(
+            batch_size=options['batch_size'],
+            progress_callback=self._report_progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted_count} message timestamps.'))
+
+    def _report_progress(self, deleted_count):
+        self.stdout.write(f'Deleted {deleted_count} message timestamps...')
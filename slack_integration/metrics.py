@@ -0,0 +1,182 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, float('inf'))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Bumped when the format of the stored labels is changed
+KEY_VERSION = 2
+
+_registry = []
+
+
+class Metric(ABC):
+    """
+    Base of the metrics stored in Redis, so the observations made by
+    all the web and Celery worker processes are aggregated together.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.key = f'metrics:{KEY_VERSION}:{name}'
+        _registry.append(self)
+
+    def collect(self):
+        """
+        Returns the lines of the metric in Prometheus text format.
+        """
+        return [f'# HELP {self.name} {self.documentation}',
+                f'# TYPE {self.name} {self.type}',
+                *self._collect_samples()]
+
+    @abstractmethod
+    def _collect_samples(self):
+        """
+        Returns the sample lines of the metric.
+        """
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        labels_field = _encode_labels(self.labelnames, labels)
+
+        try:
+            get_redis_connection().hincrbyfloat(self.key, labels_field,
+                                                amount)
+        except RedisError:
+            # Metrics must never break the observed code
+            logger.warning('Failed to store the %s increment.', self.name,
+                           exc_info=True)
+
+    def _collect_samples(self):
+        values = get_redis_connection().hgetall(self.key)
+
+        return [_format_sample(self.name, _decode_labels(labels_field),
+                               value)
+                for labels_field, value in sorted(values.items())]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames,
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        labels_field = _encode_labels(self.labelnames, labels)
+
+        try:
+            pipeline = get_redis_connection().pipeline(transaction=False)
+            for bucket in self.buckets:
+                if value <= bucket:
+                    pipeline.hincrby(f'{self.key}:bucket',
+                                     f'{labels_field}|{bucket}', 1)
+            pipeline.hincrbyfloat(f'{self.key}:sum', labels_field, value)
+            pipeline.hincrby(f'{self.key}:count', labels_field, 1)
+            pipeline.execute()
+        except RedisError:
+            # Metrics must never break the observed code
+            logger.warning('Failed to store the %s observation.', self.name,
+                           exc_info=True)
+
+    def _collect_samples(self):
+        pipeline = get_redis_connection().pipeline(transaction=False)
+        for suffix in ('bucket', 'sum', 'count'):
+            pipeline.hgetall(f'{self.key}:{suffix}')
+        bucket_values, sums, counts = pipeline.execute()
+
+        buckets = defaultdict(dict)
+        for field, value in bucket_values.items():
+            # The bucket is a number, so the last `|` separates it
+            labels_field, bucket = field.rsplit(b'|', 1)
+            buckets[labels_field][float(bucket)] = value
+
+        samples = []
+        for labels_field, count in sorted(counts.items()):
+            labels = _decode_labels(labels_field)
+            for bucket in self.buckets:
+                le = '+Inf' if bucket == float('inf') else str(bucket)
+                samples.append(_format_sample(
+                    f'{self.name}_bucket', (*labels, ('le', le)),
+                    buckets[labels_field].get(bucket, 0)))
+            samples.append(_format_sample(f'{self.name}_sum', labels,
+                                          sums.get(labels_field, 0)))
+            samples.append(_format_sample(f'{self.name}_count', labels,
+                                          count))
+
+        return samples
+
+
+def generate_latest():
+    """
+    Returns all the registered metrics in Prometheus text format.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.collect())
+
+    return '\n'.join(lines) + '\n'
+
+
+def _encode_labels(labelnames, labels):
+    """
+    Returns the labels as the JSON array of the `[name, value]` pairs
+    sorted by name, so any values are stored unambiguously.
+    """
+    return json.dumps(sorted((name, str(labels[name]))
+                             for name in labelnames))
+
+
+def _decode_labels(labels_field):
+    return tuple(tuple(label) for label in json.loads(labels_field))
+
+
+def _format_sample(name, labels, value):
+    """
+    Returns the sample line, the label values are escaped
+    as the Prometheus text format requires.
+    """
+    formatted_labels = []
+    for label_name, label_value in labels:
+        label_value = label_value.replace('\\', r'\\').replace(
+                          '"', r'\"').replace('\n', r'\n')
+        formatted_labels.append(f'{label_name}="{label_value}"')
+
+    if isinstance(value, bytes):
+        value = value.decode()
+    if formatted_labels:
+        name = f'{name}{{{",".join(formatted_labels)}}}'
+
+    return f'{name} {float(value)}'
+
+
+callback_request_duration = Histogram(
+    'callback_request_duration_seconds',
+    'Duration of the deliveries to the subscribers callback urls.',
+    ('host', 'status'))
+
+slack_api_request_duration = Histogram(
+    'slack_api_request_duration_seconds',
+    'Duration of the calls to Slack API.',
+    ('app_id', 'method', 'status'))
+
+slack_api_errors = Counter(
+    'slack_api_errors_total',
+    'Calls to Slack API failed with the error code.',
+    ('app_id', 'method', 'error'))
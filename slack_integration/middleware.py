@@ -0,0 +1,114 @@
+import hashlib
+import hmac
+import threading
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from slack_integration.models import SlackApplication
+
+
+SIGNATURE_VERSION = 'v0'
+
+
+def slack_signature_required(view):
+    """
+    Marks the view receiving the requests from Slack,
+    so `SlackSignatureMiddleware` verifies them.
+    """
+    view.slack_signature_required = True
+    return view
+
+
+class SigningSecrets:
+    """
+    Process-wide in-memory copy of the signing secrets
+    of the applications, keyed by the application id.
+
+    The copy is reloaded every `SLACK_SIGNING_SECRETS_CACHE_TIMEOUT`
+    seconds or on demand (e.g. when a signature does not match any
+    secret, so new applications are picked up), but not more often
+    than every `SLACK_SIGNING_SECRETS_MIN_RELOAD_INTERVAL` seconds,
+    so forged requests can not flood the database.
+    """
+
+    def __init__(self):
+        self._secrets = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def get_secrets(self, reload=False):
+        age = time.monotonic() - self._loaded_at
+        if (self._secrets is None or
+                age >= settings.SLACK_SIGNING_SECRETS_CACHE_TIMEOUT or
+                (reload and
+                 age >= settings.SLACK_SIGNING_SECRETS_MIN_RELOAD_INTERVAL)):
+            with self._lock:
+                self._secrets = dict(SlackApplication.objects.values_list(
+                                         'id', 'signing_secret'))
+                self._loaded_at = time.monotonic()
+
+        return self._secrets
+
+    def invalidate(self):
+        with self._lock:
+            self._secrets = None
+
+
+signing_secrets = SigningSecrets()
+
+
+class SlackSignatureMiddleware(MiddlewareMixin):
+    """
+    Verifies the signature of the requests to the views marked
+    by `slack_signature_required` before they are parsed by DRF.
+    The signature is the HMAC of the raw body and the timestamp,
+    the timestamps older than `SLACK_SIGNATURE_MAX_AGE` seconds
+    are rejected as replayed.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (not getattr(view_func, 'slack_signature_required', False) or
+                not settings.SLACK_SIGNATURE_VERIFICATION):
+            return None
+
+        timestamp = request.META.get('HTTP_X_SLACK_REQUEST_TIMESTAMP', '')
+        signature = request.META.get('HTTP_X_SLACK_SIGNATURE', '')
+
+        try:
+            age = abs(time.time() - int(timestamp))
+        except ValueError:
+            return self._reject('The request timestamp is invalid.')
+        if age > settings.SLACK_SIGNATURE_MAX_AGE:
+            return self._reject('The request timestamp is expired.')
+
+        base_string = b':'.join((SIGNATURE_VERSION.encode(),
+                                 timestamp.encode(),
+                                 request.body))
+        secrets = signing_secrets.get_secrets()
+        if not self._is_signed(base_string, signature, secrets):
+            reloaded_secrets = signing_secrets.get_secrets(reload=True)
+            if (reloaded_secrets is secrets or
+                    not self._is_signed(base_string, signature,
+                                        reloaded_secrets)):
+                return self._reject('The request signature is invalid.')
+
+        return None
+
+    @staticmethod
+    def _is_signed(base_string, signature, secrets):
+        for secret in secrets.values():
+            expected_signature = '{}={}'.format(
+                SIGNATURE_VERSION,
+                hmac.new(secret.encode(), base_string,
+                         hashlib.sha256).hexdigest())
+            if hmac.compare_digest(expected_signature, signature):
+                return True
+
+        return False
+
+    @staticmethod
+    def _reject(detail):
+        return JsonResponse({'detail': detail}, status=403)
@@ -0,0 +1,25 @@
+# Generated by Django 3.0.8 on 2026-10-18 10:12
+
+import django.core.validators
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slack_integration', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagetimestamp',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='message_timestamps_retention_days',
+            field=models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.8 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slack_integration', '0002_message_timestamps_retention'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='messagetimestamp',
+            index=models.Index(fields=['ts'], name='messagetimestamp_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-18 13:20
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slack_integration', '0003_messagetimestamp_ts_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actionsblock',
+            name='callback_max_batch_size',
+            field=models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='actionsblock',
+            name='callback_max_linger_ms',
+            field=models.PositiveIntegerField(default=1000),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='callback_max_batch_size',
+            field=models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='callback_max_linger_ms',
+            field=models.PositiveIntegerField(default=1000),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-18 15:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_celery_beat', '0012_periodictask_expire_seconds'),
+        ('slack_integration', '0004_callback_batching'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='periodic_task',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='templates', to='django_celery_beat.periodictask'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+import re
+
+from django.db import migrations
+
+
+TEMPLATE_TASK_NAME_RE = re.compile(r'^app_id:\d+\|template_id:(\d+)$')
+BATCH_SIZE = 1000
+
+
+def link_template_periodic_tasks(apps, schema_editor):
+    """
+    Links the templates to the periodic tasks
+    named `app_id:X|template_id:Y`.
+    """
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    Template = apps.get_model('slack_integration', 'Template')
+
+    periodic_task_ids = {}
+    for periodic_task_id, name in PeriodicTask.objects.filter(
+            task='slack_integration.tasks.post_message').values_list(
+                'id', 'name'):
+        match = TEMPLATE_TASK_NAME_RE.match(name)
+        if match:
+            periodic_task_ids[int(match.group(1))] = periodic_task_id
+
+    template_objs = Template.objects.filter(pk__in=periodic_task_ids)
+    for template_obj in template_objs:
+        template_obj.periodic_task_id = periodic_task_ids[template_obj.id]
+    Template.objects.bulk_update(template_objs, ('periodic_task',),
+                                 batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slack_integration', '0005_template_periodic_task'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_template_periodic_tasks,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_channel_ids(apps, schema_editor):
+    """
+    Copies the channel of the template to its message timestamps,
+    the messages were posted to it.
+    """
+    Template = apps.get_model('slack_integration', 'Template')
+    MessageTimeStamp = apps.get_model('slack_integration',
+                                      'MessageTimeStamp')
+
+    MessageTimeStamp.objects.update(channel_id=Subquery(
+        Template.objects.filter(pk=OuterRef('template_id')).values(
+            'channel_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slack_integration', '0006_link_template_periodic_tasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagetimestamp',
+            name='channel_id',
+            field=models.CharField(default='', max_length=15),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_channel_ids, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
-from django.core.validators import MinLengthValidator
+from django.core.validators import MinLengthValidator, MinValueValidator
+from django.utils import timezone
+from django_celery_beat.models import PeriodicTask
 
 
 class SlackApplication(models.Model):
@@ -14,7 +16,23 @@ class SlackApplication(models.Model):
                                                    ])
 
 
-class Template(models.Model):
+class CallbackBatchingModel(models.Model):
+    """
+    Settings of coalescing the deliveries to `callback_url`
+    into JSON array batches. Batching is off if the batch size is 1.
+    """
+    callback_max_batch_size = models.PositiveIntegerField(
+                                  default=1,
+                                  validators=[
+                                      MinValueValidator(1),
+                                  ])
+    callback_max_linger_ms = models.PositiveIntegerField(default=1000)
+
+    class Meta:
+        abstract = True
+
+
+class Template(CallbackBatchingModel):
     application = models.ForeignKey(SlackApplication,
                                     on_delete=models.CASCADE,
                                     related_name='templates')
@@ -24,8 +42,24 @@ class Template(models.Model):
     fallback_text = models.CharField(max_length=255)
     thread_subscription = models.BooleanField(default=False)
     callback_url = models.URLField(blank=True)
+    # If it is not set, MESSAGE_TIMESTAMPS_RETENTION_DAYS setting is used
+    message_timestamps_retention_days = models.PositiveIntegerField(
+                                            null=True,
+                                            blank=True,
+                                            validators=[
+                                                MinValueValidator(1),
+                                            ])
 
-    class Meta:
+    # The periodic task of the template or the one fanning the messages
+    # out to all the templates with the same crontab
+    # (SLACK_CRONTAB_FANOUT setting)
+    periodic_task = models.ForeignKey(PeriodicTask,
+                                      on_delete=models.SET_NULL,
+                                      null=True,
+                                      blank=True,
+                                      related_name='templates')
+
+    class Meta(CallbackBatchingModel.Meta):
         unique_together = ('application', 'name')
 
 
@@ -37,13 +71,20 @@ class MessageTimeStamp(models.Model):
     template = models.ForeignKey(Template,
                                  on_delete=models.CASCADE,
                                  related_name='message_timestamps')
+    # The ts of a message is unique within its channel only
+    channel_id = models.CharField(max_length=15)
     ts = models.CharField(max_length=20)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     class Meta:
         unique_together = ('template', 'ts')
+        indexes = [
+            # The thread events are routed by `ts` only
+            models.Index(fields=['ts'], name='messagetimestamp_ts_idx'),
+        ]
 
 
-class ActionsBlock(models.Model):
+class ActionsBlock(CallbackBatchingModel):
     template = models.OneToOneField(Template,
                                     on_delete=models.CASCADE,
                                     related_name='actions_block')
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from slack_integration.models import Template, MessageTimeStamp
+
+
+def delete_expired_message_timestamps(batch_size=None, progress_callback=None):
+    """
+    Deletes the message timestamps older than the retention period
+    of their templates. Rows are deleted in batches of `batch_size`,
+    `progress_callback` is called with the total number of deleted
+    rows after every batch. Returns the number of deleted rows.
+    """
+    batch_size = (batch_size or
+                  settings.MESSAGE_TIMESTAMPS_COMPACTION_BATCH_SIZE)
+    now = timezone.now()
+    deleted_count = 0
+
+    # The templates with the shortest retention are compacted first
+    retention_days_values = Template.objects.values_list(
+        'message_timestamps_retention_days', flat=True).order_by(
+            'message_timestamps_retention_days').distinct()
+
+    for retention_days in retention_days_values:
+        if retention_days is None:
+            expired_timestamps = MessageTimeStamp.objects.filter(
+                template__message_timestamps_retention_days__isnull=True)
+            retention_days = settings.MESSAGE_TIMESTAMPS_RETENTION_DAYS
+        else:
+            expired_timestamps = MessageTimeStamp.objects.filter(
+                template__message_timestamps_retention_days=retention_days)
+
+        # The timestamps are kept forever
+        if retention_days is None:
+            continue
+
+        expired_timestamps = expired_timestamps.filter(
+            created_at__lt=now - timedelta(days=retention_days))
+
+        while True:
+            batch_pks = list(expired_timestamps.values_list(
+                                 'pk', flat=True)[:batch_size])
+            if not batch_pks:
+                break
+
+            # post_delete signals remove the timestamps from the index
+            # of the thread events
+            MessageTimeStamp.objects.filter(pk__in=batch_pks).delete()
+
+            deleted_count += len(batch_pks)
+            if progress_callback:
+                progress_callback(deleted_count)
+
+    return deleted_count
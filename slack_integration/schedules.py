@@ -0,0 +1,154 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django_celery_beat.models import PeriodicTask, PeriodicTasks
+
+from slack_integration.models import Template
+
+
+TEMPLATE_TASK = 'slack_integration.tasks.post_message'
+TEMPLATE_TASK_NAME = 'app_id:{app_id}|template_id:{template_id}'
+FANOUT_TASK = 'slack_integration.tasks.post_scheduled_messages'
+FANOUT_TASK_NAME = 'crontab:{crontab_id}'
+
+
+def get_periodic_task(template_obj):
+    """
+    Returns the periodic task posting the messages of the template
+    or None if the template is not scheduled.
+    """
+    return template_obj.periodic_task
+
+
+@transaction.atomic
+def schedule_template(template_obj, crontab_obj):
+    """
+    Schedules the messages of the template by the crontab. If
+    `SLACK_CRONTAB_FANOUT` setting is on, the template is attached
+    to the periodic task shared by all the templates with the crontab,
+    otherwise it gets a periodic task of its own.
+    """
+    previous_periodic_task = get_periodic_task(template_obj)
+
+    if settings.SLACK_CRONTAB_FANOUT:
+        periodic_task = PeriodicTask.objects.get_or_create(
+            name=FANOUT_TASK_NAME.format(crontab_id=crontab_obj.id),
+            defaults={
+                'crontab': crontab_obj,
+                'task': FANOUT_TASK,
+                'kwargs': json.dumps({'crontab_id': crontab_obj.id}),
+            })[0]
+    elif (previous_periodic_task and
+            previous_periodic_task.task == TEMPLATE_TASK):
+        periodic_task = previous_periodic_task
+        periodic_task.crontab = crontab_obj
+        periodic_task.save()
+    else:
+        periodic_task = PeriodicTask.objects.create(
+            crontab=crontab_obj,
+            name=TEMPLATE_TASK_NAME.format(
+                app_id=template_obj.application_id,
+                template_id=template_obj.id),
+            task=TEMPLATE_TASK,
+            kwargs=json.dumps({'app_id': template_obj.application_id,
+                               'template_id': template_obj.id}))
+
+    template_obj.periodic_task = periodic_task
+    template_obj.save(update_fields=['periodic_task'])
+
+    if previous_periodic_task and previous_periodic_task != periodic_task:
+        release_periodic_tasks(previous_periodic_task.id)
+
+    return periodic_task
+
+
+@transaction.atomic
+def unschedule_template(template_obj):
+    periodic_task = get_periodic_task(template_obj)
+
+    template_obj.periodic_task = None
+    template_obj.save(update_fields=['periodic_task'])
+
+    if periodic_task:
+        release_periodic_tasks(periodic_task.id)
+
+
+@transaction.atomic
+def schedule_templates(template_objs, crontab_obj):
+    """
+    Set-based variant of `schedule_template` for many templates.
+    The periodic tasks are created and updated in bulk, so beat
+    is notified about the changes once.
+    """
+    previous_periodic_task_ids = {template_obj.periodic_task_id
+                                  for template_obj in template_objs} - {None}
+
+    if settings.SLACK_CRONTAB_FANOUT:
+        periodic_task = PeriodicTask.objects.get_or_create(
+            name=FANOUT_TASK_NAME.format(crontab_id=crontab_obj.id),
+            defaults={
+                'crontab': crontab_obj,
+                'task': FANOUT_TASK,
+                'kwargs': json.dumps({'crontab_id': crontab_obj.id}),
+            })[0]
+        for template_obj in template_objs:
+            template_obj.periodic_task = periodic_task
+    else:
+        template_periodic_tasks = PeriodicTask.objects.filter(
+            pk__in=previous_periodic_task_ids,
+            task=TEMPLATE_TASK).in_bulk()
+        for periodic_task in template_periodic_tasks.values():
+            periodic_task.crontab = crontab_obj
+        PeriodicTask.objects.bulk_update(template_periodic_tasks.values(),
+                                         ('crontab',))
+
+        new_periodic_tasks = {
+            template_obj.id: PeriodicTask(
+                crontab=crontab_obj,
+                name=TEMPLATE_TASK_NAME.format(
+                    app_id=template_obj.application_id,
+                    template_id=template_obj.id),
+                task=TEMPLATE_TASK,
+                kwargs=json.dumps({'app_id': template_obj.application_id,
+                                   'template_id': template_obj.id}))
+            for template_obj in template_objs
+            if template_obj.periodic_task_id not in template_periodic_tasks
+        }
+        PeriodicTask.objects.bulk_create(new_periodic_tasks.values())
+
+        for template_obj in template_objs:
+            template_obj.periodic_task = (
+                template_periodic_tasks.get(template_obj.periodic_task_id) or
+                new_periodic_tasks[template_obj.id])
+
+    Template.objects.bulk_update(template_objs, ('periodic_task',))
+    # The bulk queries do not send the signals beat is notified by
+    PeriodicTasks.update_changed()
+
+    release_periodic_tasks(*(previous_periodic_task_ids -
+                             {template_obj.periodic_task_id
+                              for template_obj in template_objs}))
+
+
+@transaction.atomic
+def unschedule_templates(template_objs):
+    periodic_task_ids = {template_obj.periodic_task_id
+                         for template_obj in template_objs} - {None}
+
+    Template.objects.filter(
+        pk__in=[template_obj.id for template_obj in template_objs]).update(
+            periodic_task=None)
+    for template_obj in template_objs:
+        template_obj.periodic_task = None
+
+    release_periodic_tasks(*periodic_task_ids)
+
+
+def release_periodic_tasks(*periodic_task_ids):
+    """
+    Deletes the periodic tasks no template is attached to
+    in one query.
+    """
+    PeriodicTask.objects.filter(pk__in=periodic_task_ids,
+                                templates__isnull=True).delete()
@@ -1,20 +1,184 @@
-from django.db.models.signals import pre_delete
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import (pre_delete, pre_save,
+                                      post_save, post_delete, m2m_changed)
 from django.dispatch import receiver
-from django.core.exceptions import ObjectDoesNotExist
+from rest_framework.authtoken.models import Token
 
-from slack_integration.models import Template
-from django_celery_beat.models import PeriodicTask
+from slack_integration import caches, schedules
+from slack_integration.middleware import signing_secrets
+from slack_integration.models import (SlackApplication, Template,
+                                      ActionsBlock, Button, MessageTimeStamp)
 
 
-@receiver(pre_delete, sender=Template)
+# The applications being deleted, their templates leave
+# the periodic tasks to `clear_application_periodic_tasks`
+_deleted_application_ids = set()
+
+
+@receiver(post_save, sender=SlackApplication)
+@receiver(post_delete, sender=SlackApplication)
+def clear_signing_secrets(sender, instance, **kwargs):
+    signing_secrets.invalidate()
+
+
+@receiver(post_save, sender=SlackApplication)
+def clear_application_send_plans(sender, instance, created, **kwargs):
+    """
+    If the application is changed (e.g. its token) -
+    clear the send plans of its templates.
+    """
+    if not created:
+        caches.invalidate_send_plans(
+            *instance.templates.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=SlackApplication)
+def collect_application_periodic_tasks(sender, instance, **kwargs):
+    instance._periodic_task_ids = set(
+        instance.templates.values_list('periodic_task_id', flat=True))
+    _deleted_application_ids.add(instance.pk)
+
+
+@receiver(post_delete, sender=SlackApplication)
+def clear_application_periodic_tasks(sender, instance, **kwargs):
+    """
+    If an application instance is deleted - delete the PeriodicTask
+    instances of its templates in one query after the templates
+    are deleted.
+    """
+    _deleted_application_ids.discard(instance.pk)
+    schedules.release_periodic_tasks(
+        *(instance._periodic_task_ids - {None}))
+
+
+@receiver(post_delete, sender=Template)
 def clear_periodic_tasks(sender, instance, **kwargs):
     """
-    If a template instance is deleting -
-    delete the associated PeriodicTask instance if it exists.
+    If a template instance is deleted - delete its PeriodicTask
+    instance, or the shared one if it was the last template of it.
+    """
+    if (instance.periodic_task_id and
+            instance.application_id not in _deleted_application_ids):
+        schedules.release_periodic_tasks(instance.periodic_task_id)
+
+
+@receiver(post_save, sender=Template)
+@receiver(post_delete, sender=Template)
+def clear_template_payload(sender, instance, **kwargs):
+    caches.invalidate_template_payload(instance.id)
+    caches.invalidate_thread_subscription(instance.id)
+
+
+@receiver(pre_save, sender=ActionsBlock)
+def clear_previous_actions_block_caches(sender, instance, **kwargs):
+    """
+    If the actions block is moved to another template or
+    its block_id is changed - clear the caches of the previous values.
+    """
+    if instance.pk is None:
+        return
+
+    previous_data = ActionsBlock.objects.filter(pk=instance.pk).values(
+                        'template_id', 'block_id').first()
+    if previous_data is None:
+        return
+
+    if previous_data['template_id'] != instance.template_id:
+        caches.invalidate_template_payload(previous_data['template_id'])
+    if previous_data['block_id'] != instance.block_id:
+        caches.invalidate_actions_block(previous_data['block_id'])
+
+
+@receiver(post_save, sender=ActionsBlock)
+@receiver(post_delete, sender=ActionsBlock)
+def clear_actions_block_caches(sender, instance, **kwargs):
+    caches.invalidate_template_payload(instance.template_id)
+    caches.invalidate_actions_block(instance.block_id)
+
+
+@receiver(pre_save, sender=Button)
+def clear_previous_button_template_payload(sender, instance, **kwargs):
+    """
+    If the button is moved to another actions block -
+    clear the payload of the previous template as well.
+    """
+    if instance.pk is None:
+        return
+
+    previous_template_id = ActionsBlock.objects.filter(
+        buttons__pk=instance.pk).values_list('template_id', flat=True).first()
+    if previous_template_id is not None:
+        caches.invalidate_template_payload(previous_template_id)
+
+
+@receiver(post_save, sender=Button)
+@receiver(post_delete, sender=Button)
+def clear_button_template_payload(sender, instance, **kwargs):
+    template_id = ActionsBlock.objects.filter(
+        pk=instance.actions_block_id).values_list('template_id',
+                                                  flat=True).first()
+    if template_id is not None:
+        caches.invalidate_template_payload(template_id)
+
+
+@receiver(post_save, sender=MessageTimeStamp)
+def index_message_timestamp(sender, instance, created, **kwargs):
+    """
+    Adds the timestamp of the posted message to the index
+    used for routing the thread events.
+    """
+    if created:
+        caches.add_thread_ts(instance.channel_id, instance.ts,
+                             instance.template_id)
+
+
+@receiver(post_delete, sender=MessageTimeStamp)
+def unindex_message_timestamp(sender, instance, **kwargs):
+    caches.remove_thread_ts((instance.channel_id, instance.ts))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def clear_user_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    If the group membership is changed from either side -
+    clear the cached group names of the affected users.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            caches.invalidate_user_groups(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        caches.invalidate_user_groups(*pk_set)
+    elif action == 'pre_clear':
+        # The members are unknown after the group is cleared
+        instance._cleared_user_ids = list(
+            instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        caches.invalidate_user_groups(*instance._cleared_user_ids)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def clear_group_users_groups(sender, instance, **kwargs):
+    """
+    If the group is renamed or deleted -
+    clear the cached group names of its members.
+    """
+    caches.invalidate_user_groups(
+        *instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def clear_auth_token(sender, instance, **kwargs):
+    caches.invalidate_auth_tokens(instance.key)
+
+
+@receiver(post_save, sender=User)
+def clear_user_auth_tokens(sender, instance, created, **kwargs):
+    """
+    If the user is changed (e.g. deactivated) -
+    clear the cached tokens with the previous user data.
     """
-    name_pattern = f'template_id:{instance.id}'
-    try:
-        periodic_task = PeriodicTask.objects.get(name__endswith=name_pattern)
-        periodic_task.delete()
-    except ObjectDoesNotExist:
-        pass
+    if not created:
+        caches.invalidate_auth_tokens(
+            *Token.objects.filter(user=instance).values_list('key',
+                                                             flat=True))
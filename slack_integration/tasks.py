@@ -1,24 +1,338 @@
+from contextlib import contextmanager
+
 import requests
+from celery import group
+from django.conf import settings
 
 from slack_integration_service.celery import app
+from slack_integration import caches, callbacks, event_stream
+from .api.slack_message_constructors import PostSlackMessageConstructor
+from .api.slack_rate_limiter import SlackRateLimited, slack_rate_limiter
 from .api.slack_web_client import CustomSlackWebClient
+from .api.slack_web_client_registry import (get_token_fingerprint,
+                                            slack_web_client_registry)
 
 from slack_integration.models import SlackApplication, Template
+from slack_integration.retention import delete_expired_message_timestamps
+from slack_integration.schedules import FANOUT_TASK
 
 
-@app.task
-def post_message(app_id, template_id):
-    """Post message to Slack."""
+@app.task(bind=True, max_retries=settings.SLACK_RATE_LIMITED_MAX_RETRIES)
+def post_message(self, app_id, template_id, message_text=None):
+    """
+    Post message to Slack. The messages without the text (e.g. the
+    scheduled ones) are posted by the cached send plan of the template.
+    """
+    if message_text is None:
+        send_plan = _get_send_plan(template_id)
+
+        with _rate_limited(self, send_plan['app_id'],
+                           send_plan['channel_id']):
+            slack_web_client = _get_send_plan_client(template_id, send_plan)
+            slack_response = slack_web_client.post_prebuilt_message(
+                                 send_plan['message'])
+
+        return _get_slack_response_result(slack_response)
+
+    app_obj = SlackApplication.objects.get(id=app_id)
+    template_obj = Template.objects.get(id=template_id)
+
+    with _rate_limited(self, app_id, template_obj.channel_id):
+        slack_web_client = CustomSlackWebClient(app_obj, template_obj)
+        slack_response = slack_web_client.post_message(message_text)
+
+    return _get_slack_response_result(slack_response)
+
+
+@app.task(bind=True, max_retries=settings.SLACK_RATE_LIMITED_MAX_RETRIES)
+def update_message(self, app_id, template_id, message_text, ts):
+    """Update the posted message in Slack."""
     app_obj = SlackApplication.objects.get(id=app_id)
     template_obj = Template.objects.get(id=template_id)
 
-    slack_web_client = CustomSlackWebClient(app_obj, template_obj)
-    slack_response = slack_web_client.post_message()
+    with _rate_limited(self, app_id, template_obj.channel_id):
+        slack_web_client = CustomSlackWebClient(app_obj, template_obj)
+        slack_response = slack_web_client.update_message(message_text, ts)
+
+    return _get_slack_response_result(slack_response)
+
+
+@app.task(bind=True, max_retries=settings.SLACK_RATE_LIMITED_MAX_RETRIES)
+def delete_message(self, app_id, channel_id, ts):
+    """Delete the posted message from Slack."""
+    app_obj = SlackApplication.objects.get(id=app_id)
+
+    with _rate_limited(self, app_id, channel_id):
+        slack_web_client = CustomSlackWebClient(app_obj,
+                                                channel_id=channel_id)
+        slack_response = slack_web_client.delete_message(ts)
+
+    return _get_slack_response_result(slack_response)
+
+
+@app.task(bind=True, max_retries=settings.SLACK_RATE_LIMITED_MAX_RETRIES)
+def post_messages(self, messages, results=None):
+    """
+    Post a chunk of messages to Slack.
+    Every message is a dict with `index`, `template_id` and `text` keys.
+    The messages postponed because of the rate limits are retried
+    by the same task, so the results of the chunk are kept together.
+    The messages still rate limited after `SLACK_RATE_LIMITED_MAX_RETRIES`
+    retries are reported with 429 status code, the messages failed
+    otherwise are reported with the error, so the chunk is not failed
+    as a whole.
+    """
+    results = results or []
+    retries_exhausted = self.request.retries >= self.max_retries
+    template_ids = {message['template_id'] for message in messages}
+    template_objs = Template.objects.select_related(
+                        'application').in_bulk(template_ids)
+
+    deferred_messages = []
+    retry_after = 0
+    for message in messages:
+        template_obj = template_objs.get(message['template_id'])
+        if template_obj is None:
+            # The template was deleted after the messages were accepted
+            results.append({'index': message['index'],
+                            'status_code': None,
+                            'data': {'ok': False,
+                                     'error': 'template_not_found'}})
+            continue
+
+        app_id = template_obj.application_id
+        channel_id = template_obj.channel_id
+        if self.request.retries:
+            slack_rate_limiter.resume(app_id, channel_id, self.request.id)
+
+        slack_web_client = CustomSlackWebClient(template_obj.application,
+                                                template_obj)
+        try:
+            slack_response = slack_web_client.post_message(message['text'])
+        except SlackRateLimited as e:
+            if retries_exhausted:
+                results.append({'index': message['index'],
+                                'status_code': 429,
+                                'data': {'ok': False,
+                                         'error': 'ratelimited'}})
+                continue
+
+            slack_rate_limiter.defer(app_id, channel_id, self.request.id,
+                                     e.retry_after)
+            deferred_messages.append(message)
+            retry_after = max(retry_after, e.retry_after)
+            continue
+        except Exception as e:
+            results.append({'index': message['index'],
+                            'status_code': None,
+                            'data': {'ok': False, 'error': str(e)}})
+            continue
+
+        results.append({'index': message['index'],
+                        **_get_slack_response_result(slack_response)})
+
+    if deferred_messages:
+        raise self.retry(args=(deferred_messages,),
+                         kwargs={'results': results},
+                         countdown=retry_after)
+
+    return results
+
+
+@app.task
+def post_scheduled_messages(crontab_id):
+    """
+    Post the messages of all the templates scheduled by the crontab
+    in chunks of `SLACK_BULK_CHUNK_SIZE` messages.
+    """
+    template_ids = list(Template.objects.filter(
+                            periodic_task__crontab_id=crontab_id,
+                            periodic_task__task=FANOUT_TASK).values_list(
+                                'id', flat=True))
+    messages = [{'index': index, 'template_id': template_id, 'text': None}
+                for index, template_id in enumerate(template_ids)]
+
+    chunk_size = settings.SLACK_BULK_CHUNK_SIZE
+    group(post_messages.s(messages[i:i + chunk_size])
+          for i in range(0, len(messages), chunk_size)).apply_async()
+
+    return len(messages)
+
 
-    return slack_response.status_code
+@app.task
+def route_slack_events():
+    """
+    Drain the stream of Slack events in batches and
+    deliver the matched events grouped by callback url.
+    """
+    routed_count = 0
+    for _ in range(settings.SLACK_EVENTS_BATCHES_PER_RUN):
+        batch_count = event_stream.route_events(_deliver_routed_events)
+        if not batch_count:
+            break
+        routed_count += batch_count
+
+    return routed_count
 
 
 @app.task
+def compact_message_timestamps():
+    """Delete the expired message timestamps."""
+    return delete_expired_message_timestamps()
+
+
+# The read timeouts are not retried, the subscriber
+# could have processed the request
+@app.task(autoretry_for=(requests.ConnectionError,
+                         callbacks.CallbackServerError),
+          max_retries=settings.CALLBACK_MAX_RETRIES,
+          retry_backoff=True,
+          retry_backoff_max=settings.CALLBACK_RETRY_BACKOFF_MAX,
+          retry_jitter=True)
 def post_request(url, data):
-    response = requests.post(url, json=data)
+    """Deliver the data to the callback url of the subscriber."""
+    response = callbacks.deliver(url, data)
     return response.status_code
+
+
+@app.task
+def flush_callback_batch(url, max_batch_size):
+    """
+    Deliver the pending items of the callback url
+    as a single JSON array.
+    """
+    batch, left_count = callbacks.pop_batch(url, max_batch_size)
+    if left_count:
+        flush_callback_batch.delay(url, max_batch_size)
+    if batch:
+        post_request.delay(url, batch)
+
+    return len(batch)
+
+
+def deliver_callback(url, data, max_batch_size=1, max_linger_ms=0):
+    """
+    Delivers the data to the callback url of the subscriber. If the
+    subscriber accepts batches, the data is coalesced with other items
+    until `max_batch_size` items are collected or `max_linger_ms`
+    milliseconds pass since the first one.
+    """
+    if max_batch_size <= 1:
+        post_request.delay(url, data)
+        return
+
+    pending_count = callbacks.push_to_batch(url, max_batch_size, data)
+    if pending_count == 1:
+        flush_callback_batch.apply_async((url, max_batch_size),
+                                         countdown=max_linger_ms / 1000)
+    elif pending_count == max_batch_size:
+        flush_callback_batch.delay(url, max_batch_size)
+
+
+@app.task
+def post_requests(url, data_list):
+    """
+    Deliver the data items to the same callback url one by one
+    over the pooled connection. Failed deliveries are retried
+    separately by `post_request`.
+    """
+    for data in data_list:
+        try:
+            callbacks.deliver(url, data)
+        except (requests.RequestException, callbacks.CallbackServerError):
+            post_request.apply_async((url, data), countdown=1)
+
+    return len(data_list)
+
+
+def _deliver_routed_events(url, data_list, max_batch_size):
+    """
+    The routed events are already collected together,
+    so they are delivered without lingering.
+    """
+    if max_batch_size <= 1:
+        post_requests.delay(url, data_list)
+        return
+
+    for i in range(0, len(data_list), max_batch_size):
+        post_request.delay(url, data_list[i:i + max_batch_size])
+
+
+def _get_send_plan(template_id):
+    """
+    Returns everything needed to post the message of the template
+    without the text: the application id with the fingerprint of its
+    token (the token itself is not cached), the channel and
+    the prebuilt payload. The plan is cached until the template,
+    its actions block, buttons or application are changed.
+    """
+    send_plan = caches.get_send_plan(template_id)
+
+    if send_plan is None:
+        template_obj = Template.objects.select_related(
+                           'application').get(id=template_id)
+        send_plan = {
+            'app_id': template_obj.application_id,
+            'token_fingerprint': get_token_fingerprint(
+                template_obj.application.bot_user_oauth_access_token),
+            'channel_id': template_obj.channel_id,
+            'thread_subscription': template_obj.thread_subscription,
+            'message': PostSlackMessageConstructor(
+                           template_obj).get_message_payload(),
+        }
+        caches.set_send_plan(template_id, send_plan)
+
+    return send_plan
+
+
+def _get_send_plan_client(template_id, send_plan):
+    """
+    Returns the client for the send plan. The application is
+    queried only if the worker thread has no client for its token yet.
+    """
+    connection = slack_web_client_registry.find_client(
+                     send_plan['app_id'], send_plan['token_fingerprint'])
+    if connection is None:
+        app_obj = SlackApplication.objects.get(id=send_plan['app_id'])
+    else:
+        app_obj = SlackApplication(id=send_plan['app_id'])
+
+    # Only the fields used to track the threads are needed
+    template_obj = Template(
+                       id=template_id,
+                       application_id=send_plan['app_id'],
+                       channel_id=send_plan['channel_id'],
+                       thread_subscription=send_plan['thread_subscription'])
+
+    return CustomSlackWebClient(app_obj, template_obj, connection=connection)
+
+
+@contextmanager
+def _rate_limited(task, app_id, channel_id):
+    """
+    Postpones the task if the call to Slack API is rate limited
+    and keeps track of the postponed tasks per channel. The task fails
+    with `SlackRateLimited` after `SLACK_RATE_LIMITED_MAX_RETRIES`
+    retries.
+    """
+    if task.request.retries:
+        slack_rate_limiter.resume(app_id, channel_id, task.request.id)
+
+    try:
+        yield
+    except SlackRateLimited as e:
+        if task.request.retries >= task.max_retries:
+            raise
+
+        slack_rate_limiter.defer(app_id, channel_id, task.request.id,
+                                 e.retry_after)
+        raise task.retry(countdown=e.retry_after)
+
+
+def _get_slack_response_result(slack_response):
+    """
+    Returns the Slack API answer in the form
+    that can be stored in the result backend.
+    """
+    return {'status_code': slack_response.status_code,
+            'data': slack_response.data}
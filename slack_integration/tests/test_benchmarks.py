@@ -0,0 +1,94 @@
+import logging
+import os
+import time
+import unittest
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from slack_integration.models import (SlackApplication, Template,
+                                      MessageTimeStamp)
+
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMPS_COUNT = int(os.environ.get('BENCHMARK_TIMESTAMPS_COUNT',
+                                      1000000))
+LOOKUPS_COUNT = 1000
+CHANNEL_ID = 'C014MGW6QUE'
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'),
+                     'Set RUN_BENCHMARKS=1 to run the benchmarks.')
+class EventRoutingBenchmark(TransactionTestCase):
+    """
+    Measures the lookup of the thread subscription made by the event
+    routing on a cache miss with and without the index on `ts`.
+    """
+
+    def setUp(self):
+        app = SlackApplication.objects.create(
+            name='app_name',
+            signing_secret='111',
+            bot_user_oauth_access_token='111')
+        templates = [
+            Template.objects.create(application=app,
+                                    name=f'template_{i}',
+                                    channel_id=CHANNEL_ID,
+                                    message_text='asasasas',
+                                    fallback_text='sadasdas',
+                                    thread_subscription=True,
+                                    callback_url='https://example.com')
+            for i in range(10)
+        ]
+
+        batch = []
+        for i in range(TIMESTAMPS_COUNT):
+            batch.append(MessageTimeStamp(template=templates[i % 10],
+                                          channel_id=CHANNEL_ID,
+                                          ts=f'{1500000000 + i}.000100'))
+            if len(batch) == 10000:
+                MessageTimeStamp.objects.bulk_create(batch)
+                batch = []
+        MessageTimeStamp.objects.bulk_create(batch)
+        self._analyze()
+
+    def test_event_routing_latency(self):
+        index = next(index for index in MessageTimeStamp._meta.indexes
+                     if index.fields == ['ts'])
+
+        with_index = self._measure_lookups()
+        with connection.schema_editor() as schema_editor:
+            schema_editor.remove_index(MessageTimeStamp, index)
+        self._analyze()
+        without_index = self._measure_lookups()
+        with connection.schema_editor() as schema_editor:
+            schema_editor.add_index(MessageTimeStamp, index)
+        self._analyze()
+
+        logger.warning('Event routing at %s timestamps: %.3f ms without '
+                       'the ts index, %.3f ms with the ts index',
+                       TIMESTAMPS_COUNT, without_index * 1000,
+                       with_index * 1000)
+        self.assertLess(with_index, without_index)
+
+    @staticmethod
+    def _analyze():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'ANALYZE {MessageTimeStamp._meta.db_table}')
+
+    def _measure_lookups(self):
+        """Returns the average lookup time in seconds."""
+        step = max(TIMESTAMPS_COUNT // LOOKUPS_COUNT, 1)
+        ts_list = [f'{1500000000 + i}.000100'
+                   for i in range(0, TIMESTAMPS_COUNT, step)]
+
+        started_at = time.perf_counter()
+        for ts in ts_list:
+            template_id = MessageTimeStamp.objects.filter(
+                channel_id=CHANNEL_ID, ts=ts).values_list(
+                    'template_id', flat=True).first()
+            self.assertIsNotNone(template_id)
+
+        return (time.perf_counter() - started_at) / len(ts_list)
@@ -0,0 +1,105 @@
+from unittest import mock
+
+import requests
+from django.conf import settings
+from django.test import SimpleTestCase
+from django_redis import get_redis_connection
+from urllib3.exceptions import EmptyPoolError
+
+from slack_integration import callbacks, tasks
+
+
+@mock.patch('slack_integration.metrics.callback_request_duration.observe')
+@mock.patch('slack_integration.callbacks.get_http_session')
+class DeliverTest(SimpleTestCase):
+    url = 'https://example.com/callback'
+
+    def test_latency_is_recorded_per_host(self, session_mock, observe_mock):
+        session_mock.return_value.post.return_value.status_code = 200
+
+        callbacks.deliver(self.url, {'some': 'data'})
+
+        observe_mock.assert_called_once_with(mock.ANY, host='example.com',
+                                             status=200)
+
+    def test_server_error_is_raised_to_retry(self, session_mock,
+                                             observe_mock):
+        session_mock.return_value.post.return_value.status_code = 503
+
+        with self.assertRaises(callbacks.CallbackServerError):
+            callbacks.deliver(self.url, {'some': 'data'})
+
+    def test_pool_timeout_is_raised_to_retry(self, session_mock,
+                                             observe_mock):
+        session_mock.return_value.post.side_effect = EmptyPoolError(
+            None, 'Pool reached maximum size.')
+
+        with self.assertRaises(requests.ConnectionError):
+            callbacks.deliver(self.url, {'some': 'data'})
+        observe_mock.assert_called_once_with(mock.ANY, host='example.com',
+                                             status='error')
+
+
+class GetHttpSessionTest(SimpleTestCase):
+    def test_session_is_reused(self):
+        self.assertIs(callbacks.get_http_session(),
+                      callbacks.get_http_session())
+
+    def test_only_connection_errors_are_retried(self):
+        retry = callbacks.get_http_session().get_adapter(
+            'https://example.com').max_retries
+
+        self.assertEqual(retry.connect,
+                         settings.CALLBACK_CONNECT_RETRIES)
+        self.assertEqual(retry.read, 0)
+
+
+@mock.patch('slack_integration.tasks.post_request.delay')
+@mock.patch('slack_integration.tasks.flush_callback_batch.apply_async')
+class DeliverCallbackTest(SimpleTestCase):
+    url = 'https://example.com/callback'
+
+    def setUp(self):
+        get_redis_connection().delete(
+            *(callbacks.BATCH_KEY.format(max_batch_size=max_batch_size,
+                                         url=self.url)
+              for max_batch_size in (2, 10)))
+
+    def test_unbatched_data_is_posted_at_once(self, apply_async_mock,
+                                              delay_mock):
+        tasks.deliver_callback(self.url, {'some': 'data'})
+
+        delay_mock.assert_called_once_with(self.url, {'some': 'data'})
+        apply_async_mock.assert_not_called()
+
+    def test_batch_is_flushed_after_linger(self, apply_async_mock,
+                                           delay_mock):
+        for i in range(3):
+            tasks.deliver_callback(self.url, {'index': i}, 10, 500)
+
+        apply_async_mock.assert_called_once_with((self.url, 10),
+                                                 countdown=0.5)
+        delay_mock.assert_not_called()
+
+        self.assertEqual(tasks.flush_callback_batch(self.url, 10), 3)
+        delay_mock.assert_called_once_with(
+            self.url, [{'index': 0}, {'index': 1}, {'index': 2}])
+
+    def test_full_batch_is_flushed_at_once(self, apply_async_mock,
+                                           delay_mock):
+        with mock.patch('slack_integration.tasks.flush_callback_batch.delay'
+                        ) as flush_mock:
+            for i in range(2):
+                tasks.deliver_callback(self.url, {'index': i}, 2, 500)
+
+        flush_mock.assert_called_once_with(self.url, 2)
+
+    def test_batches_of_different_sizes_are_kept_apart(self,
+                                                       apply_async_mock,
+                                                       delay_mock):
+        tasks.deliver_callback(self.url, {'index': 0}, 10, 500)
+        tasks.deliver_callback(self.url, {'index': 1}, 2, 500)
+
+        self.assertEqual(apply_async_mock.call_count, 2)
+        self.assertEqual(tasks.flush_callback_batch(self.url, 10), 1)
+        delay_mock.assert_called_once_with(self.url, [{'index': 0}])
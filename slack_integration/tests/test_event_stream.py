@@ -0,0 +1,37 @@
+from unittest import mock
+
+from django.test import TestCase
+from django_redis import get_redis_connection
+
+from slack_integration import event_stream
+
+
+class RouteEventsTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    def setUp(self):
+        get_redis_connection().delete(event_stream.STREAM_KEY)
+
+    def test_events_are_grouped_by_callback_url(self):
+        events = [
+            {'event': {'channel': 'C014MGW6QUE',
+                       'thread_ts': '1593606523.001500'}},
+            {'event': {'channel': 'C014MGW6QUE',
+                       'thread_ts': '1593608041.001800'}},
+            {'event': {'channel': 'C014MGW6QUE',
+                       'thread_ts': '1111111111.000000'}},
+            {'event': {'channel': 'C0OTHER',
+                       'thread_ts': '1593606523.001500'}},
+            {'event': {}},
+        ]
+        for event in events:
+            event_stream.append_event(event)
+        deliver = mock.Mock()
+
+        with self.assertNumQueries(1):
+            handled_count = event_stream.route_events(deliver)
+
+        self.assertEqual(handled_count, 5)
+        deliver.assert_called_once_with('https://postman-echo.com/post',
+                                        events[:2], 1)
+        self.assertEqual(event_stream.route_events(deliver), 0)
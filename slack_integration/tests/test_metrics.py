@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django_redis import get_redis_connection
+from rest_framework.authtoken.models import Token
+
+from slack_integration import metrics
+
+
+class MetricsTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    def setUp(self):
+        get_redis_connection().delete(
+            metrics.slack_api_errors.key,
+            *(f'{metrics.slack_api_request_duration.key}:{suffix}'
+              for suffix in ('bucket', 'sum', 'count')))
+
+    def test_counter_is_exposed(self):
+        metrics.slack_api_errors.inc(app_id=1, method='chat_postMessage',
+                                     error='channel_not_found')
+        metrics.slack_api_errors.inc(app_id=1, method='chat_postMessage',
+                                     error='channel_not_found')
+
+        self.assertIn('slack_api_errors_total{app_id="1",'
+                      'error="channel_not_found",'
+                      'method="chat_postMessage"} 2.0',
+                      metrics.generate_latest())
+
+    def test_label_values_are_escaped(self):
+        metrics.slack_api_errors.inc(app_id=1, method='a=b,c',
+                                     error='"x"\\y\n')
+
+        self.assertIn('slack_api_errors_total{app_id="1",'
+                      'error="\\"x\\"\\\\y\\n",'
+                      'method="a=b,c"} 1.0',
+                      metrics.generate_latest())
+
+    def test_histogram_is_exposed(self):
+        metrics.slack_api_request_duration.observe(
+            0.3, app_id=1, method='chat_update', status=200)
+
+        exposition = metrics.generate_latest()
+
+        labels = 'app_id="1",method="chat_update",status="200"'
+        self.assertIn(
+            f'slack_api_request_duration_seconds_bucket{{{labels},le="0.25"}}'
+            ' 0.0', exposition)
+        self.assertIn(
+            f'slack_api_request_duration_seconds_bucket{{{labels},le="0.5"}}'
+            ' 1.0', exposition)
+        self.assertIn(
+            f'slack_api_request_duration_seconds_bucket{{{labels},le="+Inf"}}'
+            ' 1.0', exposition)
+        self.assertIn(
+            f'slack_api_request_duration_seconds_count{{{labels}}} 1.0',
+            exposition)
+
+    def test_metrics_endpoint(self):
+        token = Token.objects.get_or_create(
+                    user=User.objects.get(username='admin'))[0]
+
+        response = self.client.get('/metrics',
+                                   HTTP_AUTHORIZATION='Token ' + token.key)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+
+    def test_metrics_endpoint_requires_administrator(self):
+        token = Token.objects.get_or_create(
+                    user=User.objects.get(username='dev'))[0]
+
+        anonymous_response = self.client.get('/metrics')
+        developer_response = self.client.get(
+                                 '/metrics',
+                                 HTTP_AUTHORIZATION='Token ' + token.key)
+
+        self.assertEqual(anonymous_response.status_code, 401)
+        self.assertEqual(developer_response.status_code, 403)
@@ -0,0 +1,74 @@
+import hashlib
+import hmac
+import json
+import time
+from unittest import mock
+
+from django.test import TestCase
+
+from slack_integration.middleware import signing_secrets
+from slack_integration.models import SlackApplication
+
+
+@mock.patch('slack_integration.tasks.post_request.delay')
+class SlackSignatureMiddlewareTest(TestCase):
+    fixtures = ('test_dump.json',)
+    tested_url = '/api/events/'
+    body = json.dumps({'event': {}})
+
+    def setUp(self):
+        signing_secrets.invalidate()
+
+    def _post_event(self, signing_secret, timestamp=None):
+        timestamp = str(int(timestamp or time.time()))
+        signature = 'v0=' + hmac.new(
+            signing_secret.encode(),
+            f'v0:{timestamp}:{self.body}'.encode(),
+            hashlib.sha256).hexdigest()
+
+        return self.client.post(self.tested_url, self.body,
+                                content_type='application/json',
+                                HTTP_X_SLACK_REQUEST_TIMESTAMP=timestamp,
+                                HTTP_X_SLACK_SIGNATURE=signature)
+
+    def test_signed_request_is_accepted(self, delay_mock):
+        signing_secret = SlackApplication.objects.first().signing_secret
+
+        self._post_event(signing_secret)
+        with self.assertNumQueries(0):
+            response = self._post_event(signing_secret)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_forged_request_is_rejected(self, delay_mock):
+        response = self._post_event('x' * 32)
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_replayed_request_is_rejected(self, delay_mock):
+        signing_secret = SlackApplication.objects.first().signing_secret
+
+        response = self._post_event(signing_secret, time.time() - 60 * 10)
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_unsigned_request_is_rejected(self, delay_mock):
+        response = self.client.post(self.tested_url, self.body,
+                                    content_type='application/json')
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_new_application_secret_is_loaded(self, delay_mock):
+        self._post_event(SlackApplication.objects.first().signing_secret)
+        signing_secret = 'n' * 32
+        SlackApplication.objects.create(name='new_app',
+                                        signing_secret=signing_secret,
+                                        bot_user_oauth_access_token='t' * 57)
+
+        response = self._post_event(signing_secret)
+
+        self.assertEqual(response.status_code, 200)
+
+
+class AsyncSlackSignatureMiddlewareTest(SlackSignatureMiddlewareTest):
+    tested_url = '/api/async/events/'
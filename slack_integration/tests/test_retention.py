@@ -0,0 +1,74 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from slack_integration.models import (SlackApplication, Template,
+                                      MessageTimeStamp)
+from slack_integration.retention import delete_expired_message_timestamps
+
+
+@override_settings(MESSAGE_TIMESTAMPS_RETENTION_DAYS=30)
+class DeleteExpiredMessageTimestampsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        app = SlackApplication.objects.create(
+            name='app_name',
+            signing_secret='111',
+            bot_user_oauth_access_token='111')
+        cls.default_template = Template.objects.create(
+            application=app,
+            name='default_template',
+            channel_id='channel',
+            message_text='asasasas',
+            fallback_text='sadasdas')
+        cls.short_template = Template.objects.create(
+            application=app,
+            name='short_template',
+            channel_id='channel',
+            message_text='asasasas',
+            fallback_text='sadasdas',
+            message_timestamps_retention_days=1)
+
+        ten_days_ago = timezone.now() - timedelta(days=10)
+        forty_days_ago = timezone.now() - timedelta(days=40)
+        for template in (cls.default_template, cls.short_template):
+            MessageTimeStamp.objects.create(template=template,
+                                            ts='1.0',
+                                            created_at=ten_days_ago)
+            MessageTimeStamp.objects.create(template=template,
+                                            ts='2.0',
+                                            created_at=forty_days_ago)
+            MessageTimeStamp.objects.create(template=template, ts='3.0')
+
+    def test_expired_timestamps_are_deleted(self):
+        deleted_count = delete_expired_message_timestamps(batch_size=1)
+
+        self.assertEqual(deleted_count, 3)
+        self.assertEqual(
+            set(self.default_template.message_timestamps.values_list(
+                'ts', flat=True)),
+            {'1.0', '3.0'})
+        self.assertEqual(
+            set(self.short_template.message_timestamps.values_list(
+                'ts', flat=True)),
+            {'3.0'})
+
+    @override_settings(MESSAGE_TIMESTAMPS_RETENTION_DAYS=None)
+    def test_default_retention_can_keep_timestamps_forever(self):
+        deleted_count = delete_expired_message_timestamps()
+
+        self.assertEqual(deleted_count, 2)
+        self.assertEqual(self.default_template.message_timestamps.count(), 3)
+
+    def test_management_command_reports_progress(self):
+        stdout = StringIO()
+        call_command('compact_message_timestamps', '--batch-size=2',
+                     no_color=True, stdout=stdout)
+
+        self.assertEqual(stdout.getvalue().splitlines(),
+                         ['Deleted 2 message timestamps...',
+                          'Deleted 3 message timestamps...',
+                          'Deleted 3 message timestamps.'])
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django_celery_beat.models import CrontabSchedule, PeriodicTask
+
+from slack_integration import schedules, tasks
+from slack_integration.models import SlackApplication, Template
+
+
+@override_settings(SLACK_CRONTAB_FANOUT=True)
+class FanoutScheduleTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    def setUp(self):
+        self.crontab_obj = CrontabSchedule.objects.get(pk=3)
+
+    def test_templates_share_periodic_task_of_crontab(self):
+        for template_obj in Template.objects.filter(pk__in=(5, 7, 8)):
+            schedules.schedule_template(template_obj, self.crontab_obj)
+
+        periodic_task = PeriodicTask.objects.get(
+                            task=schedules.FANOUT_TASK)
+        self.assertEqual(periodic_task.crontab, self.crontab_obj)
+        self.assertEqual(periodic_task.templates.count(), 3)
+
+    def test_template_task_is_replaced(self):
+        template_obj = Template.objects.get(pk=1)
+
+        schedules.schedule_template(template_obj, self.crontab_obj)
+
+        self.assertFalse(PeriodicTask.objects.filter(
+            name='app_id:1|template_id:1').exists())
+        self.assertEqual(template_obj.periodic_task.task,
+                         schedules.FANOUT_TASK)
+
+    def test_periodic_task_is_deleted_with_last_template(self):
+        template_objs = Template.objects.filter(pk__in=(5, 7))
+        for template_obj in template_objs:
+            schedules.schedule_template(template_obj, self.crontab_obj)
+
+        schedules.unschedule_template(template_objs[0])
+        self.assertTrue(PeriodicTask.objects.filter(
+            task=schedules.FANOUT_TASK).exists())
+
+        template_objs[1].delete()
+        self.assertFalse(PeriodicTask.objects.filter(
+            task=schedules.FANOUT_TASK).exists())
+
+    @override_settings(SLACK_BULK_CHUNK_SIZE=2)
+    @mock.patch('slack_integration.tasks.group')
+    def test_messages_are_posted_in_chunks(self, group_mock):
+        for template_obj in Template.objects.filter(pk__in=(5, 7, 8)):
+            schedules.schedule_template(template_obj, self.crontab_obj)
+
+        posted_count = tasks.post_scheduled_messages(self.crontab_obj.id)
+
+        self.assertEqual(posted_count, 3)
+        self.assertEqual(len(list(group_mock.call_args[0][0])), 2)
+
+
+@override_settings(SLACK_CRONTAB_FANOUT=False)
+class TemplateScheduleTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    def test_periodic_task_crontab_is_updated(self):
+        crontab_obj = CrontabSchedule.objects.get(pk=3)
+        template_obj = Template.objects.get(pk=1)
+
+        schedules.schedule_template(template_obj, crontab_obj)
+
+        self.assertEqual(PeriodicTask.objects.get(pk=2).crontab, crontab_obj)
+
+    def test_periodic_tasks_are_deleted_with_templates(self):
+        crontab_obj = CrontabSchedule.objects.get(pk=3)
+        for template_obj in Template.objects.filter(application_id=1):
+            schedules.schedule_template(template_obj, crontab_obj)
+
+        Template.objects.filter(application_id=1).delete()
+
+        self.assertFalse(PeriodicTask.objects.filter(
+            task=schedules.TEMPLATE_TASK).exists())
+
+    def test_periodic_tasks_are_deleted_with_application(self):
+        crontab_obj = CrontabSchedule.objects.get(pk=3)
+        for template_obj in Template.objects.filter(application_id=1):
+            schedules.schedule_template(template_obj, crontab_obj)
+        app_obj = SlackApplication.objects.get(pk=1)
+
+        # The periodic tasks of all the templates are deleted at once
+        with self.assertNumQueries(18):
+            app_obj.delete()
+
+        self.assertFalse(PeriodicTask.objects.filter(
+            task=schedules.TEMPLATE_TASK).exists())
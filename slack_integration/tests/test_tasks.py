@@ -0,0 +1,126 @@
+from unittest import mock
+
+import aiohttp
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+
+from slack_integration import tasks
+from slack_integration.api.slack_rate_limiter import SlackRateLimited
+from slack_integration.api.slack_web_client_registry import (
+    slack_web_client_registry)
+from slack_integration.models import SlackApplication, Template
+
+
+@mock.patch('slack_integration.api.slack_web_client.slack_rate_limiter')
+@mock.patch('slack_integration.api.slack_web_client.metrics')
+class PostMessageSendPlanTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    def setUp(self):
+        cache.clear()
+        slack_web_client_registry.clear()
+
+        template_obj = Template.objects.select_related(
+                           'application').get(pk=1)
+        self.connection = slack_web_client_registry.get_client(
+                              template_obj.application_id,
+                              template_obj.application
+                                          .bot_user_oauth_access_token)
+        self.connection.chat_postMessage = mock.Mock(
+            return_value=mock.Mock(status_code=200,
+                                   data={'ok': True,
+                                         'ts': '1600000000.000200'}))
+
+    def test_scheduled_message_does_not_query_database(self, *mocks):
+        tasks.post_message(1, 1)
+
+        with self.assertNumQueries(1):
+            # The timestamp of the subscribed template is inserted only
+            tasks.post_message(1, 1)
+
+        self.assertEqual(self.connection.chat_postMessage.call_count, 2)
+        self.assertEqual(
+            self.connection.chat_postMessage.call_args[1]['channel'],
+            'C014MGW6QUE')
+
+    def test_template_change_invalidates_send_plan(self, *mocks):
+        tasks.post_message(1, 1)
+        Template.objects.filter(pk=1).update(thread_subscription=False)
+        template_obj = Template.objects.get(pk=1)
+        template_obj.message_text = 'New message text.'
+        template_obj.save()
+
+        tasks.post_message(1, 1)
+
+        blocks = self.connection.chat_postMessage.call_args[1]['blocks']
+        self.assertEqual(blocks[0]['text']['text'], 'New message text.')
+
+    def test_token_change_invalidates_send_plan(self, *mocks):
+        tasks.post_message(1, 1)
+        app_obj = SlackApplication.objects.get(pk=1)
+        app_obj.bot_user_oauth_access_token = 'n' * 57
+        app_obj.save()
+
+        with mock.patch.object(slack_web_client_registry,
+                               'get_client') as get_client_mock:
+            tasks.post_message(1, 1)
+
+        get_client_mock.assert_called_once_with(1, 'n' * 57)
+
+
+@mock.patch('slack_integration.tasks.slack_rate_limiter')
+@mock.patch('slack_integration.tasks.CustomSlackWebClient')
+class RateLimitedRetriesTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    def test_messages_are_reported_after_last_retry(self, client_mock,
+                                                    rate_limiter_mock):
+        client_mock.return_value.post_message.side_effect = (
+            SlackRateLimited(30))
+
+        async_result = tasks.post_messages.apply(
+            args=([{'index': 0, 'template_id': 1, 'text': 'text'}],),
+            retries=settings.SLACK_RATE_LIMITED_MAX_RETRIES)
+
+        self.assertEqual(async_result.result,
+                         [{'index': 0,
+                           'status_code': 429,
+                           'data': {'ok': False, 'error': 'ratelimited'}}])
+        rate_limiter_mock.defer.assert_not_called()
+
+    def test_message_job_fails_after_last_retry(self, client_mock,
+                                                rate_limiter_mock):
+        client_mock.return_value.delete_message.side_effect = (
+            SlackRateLimited(30))
+
+        async_result = tasks.delete_message.apply(
+            args=(1, 'C014MGW6QUE', '1600000000.000200'),
+            retries=settings.SLACK_RATE_LIMITED_MAX_RETRIES)
+
+        self.assertIsInstance(async_result.result, SlackRateLimited)
+        rate_limiter_mock.defer.assert_not_called()
+
+
+@mock.patch('slack_integration.tasks.CustomSlackWebClient')
+class PostMessagesTest(TestCase):
+    fixtures = ('test_dump.json',)
+
+    def test_failed_message_does_not_fail_chunk(self, client_mock):
+        client_mock.return_value.post_message.side_effect = (
+            mock.Mock(status_code=200, data={'ok': True}),
+            aiohttp.ClientError('Connection reset by peer'),
+            mock.Mock(status_code=200, data={'ok': True}))
+
+        results = tasks.post_messages([
+            {'index': i, 'template_id': 1, 'text': 'text'}
+            for i in range(3)
+        ])
+
+        self.assertEqual(results, [
+            {'index': 0, 'status_code': 200, 'data': {'ok': True}},
+            {'index': 1,
+             'status_code': None,
+             'data': {'ok': False, 'error': 'Connection reset by peer'}},
+            {'index': 2, 'status_code': 200, 'data': {'ok': True}},
+        ])
@@ -11,6 +11,9 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import sys
+
+from celery.schedules import crontab
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -48,6 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Rejects forged Slack requests before the other middleware and DRF
+    'slack_integration.middleware.SlackSignatureMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -132,7 +137,7 @@ STATIC_URL = '/static/'
 # DRF
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'slack_integration.api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -144,7 +149,131 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 15,
 }
 
+# Cache
+# The tests flush the cache, so they use a Redis database of their own.
+# Redis is still needed by them, the streams, batches, rate limits and
+# metrics are stored in it directly.
+CACHE_REDIS_DB = 15 if sys.argv[1:2] == ['test'] else 2
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': '{}/{}'.format(
+            os.environ.get('REDIS', 'redis://redis:6379'), CACHE_REDIS_DB),
+    }
+}
+
 # Celery
 CELERY_BROKER_URL = os.environ.get('REDIS', 'redis://redis:6379') + '/0'
 CELERY_RESULT_BACKEND = os.environ.get('REDIS', 'redis://redis:6379') + '/1'
 CELERY_TIMEZONE = 'Europe/Kiev'
+CELERY_BEAT_SCHEDULE = {
+    'compact-message-timestamps': {
+        'task': 'slack_integration.tasks.compact_message_timestamps',
+        'schedule': crontab(minute=0, hour=4),
+    },
+}
+CELERY_TASK_ROUTES = {
+    # Drained by the dedicated `events_router` worker
+    'slack_integration.tasks.route_slack_events': {'queue': 'slack_events'},
+}
+
+# Slack web clients
+SLACK_CLIENT_POOL_SIZE = int(os.environ.get('SLACK_CLIENT_POOL_SIZE', 10))
+SLACK_CLIENT_KEEPALIVE_TIMEOUT = int(
+    os.environ.get('SLACK_CLIENT_KEEPALIVE_TIMEOUT', 60))
+SLACK_CLIENT_TIMEOUT = int(os.environ.get('SLACK_CLIENT_TIMEOUT', 30))
+
+# Caching of the prebuilt message payloads of templates (seconds)
+TEMPLATE_PAYLOAD_CACHE_TIMEOUT = 60 * 60 * 24
+# Caching of the unknown block ids of the interactivity payloads (seconds)
+ACTIONS_BLOCK_NEGATIVE_CACHE_TIMEOUT = 60 * 5
+# Caching of the unknown threads of the events (seconds)
+THREAD_TS_NEGATIVE_CACHE_TIMEOUT = 60 * 5
+# Expiration of the lock of the thread ts index build (seconds)
+THREAD_TS_INDEX_BUILD_LOCK_TIMEOUT = 60 * 30
+
+# Tracking of the jobs of the async mode of the message views and the
+# batches of the bulk post view (seconds), Celery keeps their results
+# for a day by default
+SLACK_MESSAGE_JOBS_TIMEOUT = 60 * 60 * 24
+
+# Caching of the authentication tokens with their users (seconds)
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 5
+# Caching of the group names used by the permission checks (seconds)
+USER_GROUPS_CACHE_TIMEOUT = 60 * 60
+
+# Scheduling of the templates: if it is on, one periodic task
+# per distinct crontab posts the messages of all its templates,
+# otherwise every template gets a periodic task of its own
+SLACK_CRONTAB_FANOUT = os.environ.get('SLACK_CRONTAB_FANOUT',
+                                      'false').lower() == 'true'
+
+# Bulk message posting
+SLACK_BULK_MAX_MESSAGES = 5000
+SLACK_BULK_CHUNK_SIZE = 50
+# Templates scheduled by one request to the bulk crontab endpoint
+SLACK_BULK_MAX_TEMPLATES = 1000
+
+# Retention of the message timestamps used for tracking threads (days).
+# Can be overridden per template, None keeps the timestamps forever,
+# so the retention is opt-in.
+MESSAGE_TIMESTAMPS_RETENTION_DAYS = None
+MESSAGE_TIMESTAMPS_COMPACTION_BATCH_SIZE = 1000
+
+# Deliveries to the subscribers callback urls
+CALLBACK_CONNECT_TIMEOUT = 3.05
+CALLBACK_READ_TIMEOUT = 10
+# Number of hosts the connection pools are kept for
+CALLBACK_POOL_CONNECTIONS = 20
+# Number of connections per host
+CALLBACK_POOL_MAXSIZE = 4
+# Seconds to wait for a free connection of the host
+CALLBACK_POOL_TIMEOUT = 30
+# Connection errors retried in place before the task is retried
+CALLBACK_CONNECT_RETRIES = 2
+CALLBACK_MAX_RETRIES = 5
+CALLBACK_RETRY_BACKOFF_MAX = 600
+
+# Limits of Slack API calls per application and channel:
+# (requests per second, burst)
+SLACK_RATE_LIMITS = {
+    'chat_postMessage': (1, 3),
+    'chat_update': (50 / 60, 5),
+    'chat_delete': (50 / 60, 5),
+}
+# Retries of the jobs postponed by the rate limits, the jobs still
+# rate limited after them fail
+SLACK_RATE_LIMITED_MAX_RETRIES = 10
+# Postponed jobs not resumed within this period are not counted (seconds)
+SLACK_DEFERRED_JOBS_STALE_AFTER = 60 * 60
+
+# Ingestion of Slack events: 'direct' routes every event in the view,
+# 'stream' appends events to the Redis stream drained in batches
+# by `route_slack_events` task.
+SLACK_EVENTS_INGESTION_MODE = os.environ.get('SLACK_EVENTS_INGESTION_MODE',
+                                             'direct')
+SLACK_EVENTS_STREAM_MAXLEN = 1000000
+SLACK_EVENTS_BATCH_SIZE = 500
+SLACK_EVENTS_BATCHES_PER_RUN = 20
+# Events not acknowledged by a consumer within this period
+# are taken over by another one (milliseconds)
+SLACK_EVENTS_CLAIM_IDLE_TIME = 60 * 1000
+if SLACK_EVENTS_INGESTION_MODE == 'stream':
+    CELERY_BEAT_SCHEDULE['route-slack-events'] = {
+        'task': 'slack_integration.tasks.route_slack_events',
+        'schedule': 1.0,
+        'options': {'expires': 5},
+    }
+# Retries of the already received events are ignored
+# within this period (seconds)
+SLACK_EVENTS_DEDUP_TIMEOUT = 60 * 60
+
+# Verification of the requests signed by Slack
+SLACK_SIGNATURE_VERIFICATION = True
+# Requests with older timestamps are rejected as replayed (seconds)
+SLACK_SIGNATURE_MAX_AGE = 60 * 5
+# The in-memory copies of the signing secrets are reloaded
+# from the database at most this often (seconds)
+SLACK_SIGNING_SECRETS_CACHE_TIMEOUT = 60
+# ... or, if a signature does not match, at least this often
+SLACK_SIGNING_SECRETS_MIN_RELOAD_INTERVAL = 5
@@ -18,8 +18,11 @@ from django.urls import path, include
 
 from rest_framework.authtoken.views import obtain_auth_token
 
+from slack_integration.api.views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('slack_integration.api.urls')),
     path('api/token-auth/', obtain_auth_token),
+    path('metrics', MetricsView.as_view()),
 ]